@@ -5,18 +5,24 @@ POST /api/v1/market_scanner/scan
 Scans the market for top performing stocks based on trading strategy.
 """
 
-from fastapi import APIRouter, HTTPException, status
+import asyncio
+from functools import partial
+from fastapi import APIRouter, HTTPException, Request, Response, status
 from typing import Dict, Any
 
+from app.core.responses import render_json, static_json_response
 from app.schemas.requests import MarketScanRequest
-from app.services.market_scanner import MarketScanner
+from app.services.market_scanner import ExcludeFilter, MarketScanner, SortKey
 
 router = APIRouter()
 market_scanner = MarketScanner()
 
+# Criteria options are static; render them once at import
+_CRITERIA_BODY = render_json(market_scanner.get_scan_criteria_options())
+
 
 @router.post("/scan")
-async def scan_market(request: MarketScanRequest) -> Dict[str, Any]:
+async def scan_market(request: MarketScanRequest, http_request: Request) -> Dict[str, Any]:
     """
     Scan the market for top performing stocks based on trading strategy.
     
@@ -38,6 +44,15 @@ async def scan_market(request: MarketScanRequest) -> Dict[str, Any]:
     First rule is primary, subsequent rules are tie-breakers.
     Example: `[{"field": "success_rate", "order": "desc"}, {"field": "return_percentage", "order": "desc"}]`
     
+    **Response size:**
+    Each result holds the stock symbol and its sortable metrics.
+    Set `verbose` to get the full trading summary and statistics instead.
+    
+    **Early exit:**
+    Set `early_exit` to stop once a few chunks of stocks in a row leave the
+    top results unchanged. Useful for large scans where only the top few
+    matter; skipped stocks are reported in `skipped_scans`.
+    
     **Market Cap Categories:**
     - mega_cap: >= $200B
     - large_cap: >= $10B
@@ -47,30 +62,38 @@ async def scan_market(request: MarketScanRequest) -> Dict[str, Any]:
     - all: All available stocks
     """
     try:
-        # Convert exclude rules to dicts
+        # Convert validated rules to lightweight value objects for the scanner
         exclude_rules = None
         if request.exclude:
-            exclude_rules = [rule.model_dump() for rule in request.exclude]
+            exclude_rules = [
+                ExcludeFilter(rule.field, rule.comparator, rule.value)
+                for rule in request.exclude
+            ]
         
-        # Convert sort rules to dicts
         sort_rules = None
         if request.sort:
-            sort_rules = [rule.model_dump() for rule in request.sort]
+            sort_rules = [SortKey(rule.field, rule.order == "desc") for rule in request.sort]
         
-        # Run scan
-        result = market_scanner.scan(
-            buy_indicator=request.buy_indicator,
-            sell_indicator=request.sell_indicator,
-            period=request.period,
-            interval=request.interval,
-            buy_threshold=request.buy_threshold,
-            sell_threshold=request.sell_threshold,
-            min_trades=request.min_trades,
-            stock_list=request.stock_list,
-            market_cap=request.market_cap,
-            top_n=request.top_n,
-            exclude_rules=exclude_rules,
-            sort_rules=sort_rules
+        # Run scan in the shared executor so the event loop stays responsive
+        result = await asyncio.get_running_loop().run_in_executor(
+            http_request.app.state.executor,
+            partial(
+                market_scanner.scan,
+                buy_indicator=request.buy_indicator,
+                sell_indicator=request.sell_indicator,
+                period=request.period,
+                interval=request.interval,
+                buy_threshold=request.buy_threshold,
+                sell_threshold=request.sell_threshold,
+                min_trades=request.min_trades,
+                stock_list=request.stock_list,
+                market_cap=request.market_cap,
+                top_n=request.top_n,
+                exclude_rules=exclude_rules,
+                sort_rules=sort_rules,
+                verbose=request.verbose,
+                early_exit=request.early_exit
+            )
         )
         
         if "error" in result:
@@ -93,6 +116,8 @@ async def scan_market(request: MarketScanRequest) -> Dict[str, Any]:
             "exclude_rules_applied": len(exclude_rules) if exclude_rules else 0,
             "sort_rules_applied": len(sort_rules) if sort_rules else 0,
             "top_n_requested": request.top_n,
+            "verbose": request.verbose,
+            "early_exit": request.early_exit,
             "top_n_returned": len(result.get("top_results", []))
         }
         
@@ -108,12 +133,12 @@ async def scan_market(request: MarketScanRequest) -> Dict[str, Any]:
 
 
 @router.get("/criteria")
-async def get_scan_criteria() -> Dict[str, Any]:
+async def get_scan_criteria() -> Response:
     """
     Get available options for scan criteria.
     
     Returns all valid values for indicators, periods, intervals,
     market cap filters, sortable fields, and exclude operators.
     """
-    return market_scanner.get_scan_criteria_options()
+    return static_json_response(_CRITERIA_BODY)
 
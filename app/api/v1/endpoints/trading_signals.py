@@ -5,21 +5,31 @@ POST /api/v1/trading_signals/current
 Get current trading signals for a list of stocks.
 """
 
-from fastapi import APIRouter, HTTPException, status
-from typing import Dict, Any
-from datetime import datetime
+import asyncio
+from collections import Counter, defaultdict
+from concurrent.futures import Executor
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from typing import Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
 
-import yfinance as yf
+import numpy as np
+import pandas as pd
 
+from app.core.responses import render_json, static_json_response
 from app.schemas.requests import TradingSignalsRequest
+from app.services.price_cache import fetch_histories
 from app.services.signal_detector import SignalDetector, SignalType
+from app.core.config import settings
 
 router = APIRouter()
 signal_detector = SignalDetector()
 
 
 @router.post("/current")
-async def get_current_trading_signals(request: TradingSignalsRequest) -> Dict[str, Any]:
+async def get_current_trading_signals(
+    request: TradingSignalsRequest,
+    http_request: Request
+) -> Dict[str, Any]:
     """
     Get current trading signals for a list of stocks.
     
@@ -43,7 +53,7 @@ async def get_current_trading_signals(request: TradingSignalsRequest) -> Dict[st
     - ERROR: Unable to analyze due to insufficient data
     """
     results = {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
         "buy_indicator": request.buy_indicator,
         "sell_indicator": request.sell_indicator,
         "buy_threshold": request.buy_threshold,
@@ -59,66 +69,182 @@ async def get_current_trading_signals(request: TradingSignalsRequest) -> Dict[st
         }
     }
     
-    for stock in request.stocks:
-        try:
-            signal_data = _analyze_stock(
+    if not request.stocks:
+        return results
+    
+    loop = asyncio.get_running_loop()
+    executor = http_request.app.state.executor
+    
+    # Fetch all histories up front instead of one request per stock
+    frames = await loop.run_in_executor(
+        executor, fetch_histories, request.stocks, request.period, "1d"
+    )
+    
+    # Evaluate stocks with aligned histories together in one vectorized pass
+    batch_signals = await loop.run_in_executor(
+        executor,
+        _batch_signals,
+        frames,
+        request.buy_indicator,
+        request.sell_indicator,
+        request.buy_threshold,
+        request.sell_threshold
+    )
+    
+    last_updated = _format_last_updated(frames)
+    
+    # Analyze stocks concurrently without blocking the event loop
+    semaphore = asyncio.BoundedSemaphore(settings.max_workers)
+    signals = await asyncio.gather(
+        *[
+            _analyze_async(
+                executor,
+                semaphore,
+                frames.get(stock),
+                batch_signals.get(stock),
+                last_updated.get(stock),
                 stock,
                 request.buy_indicator,
                 request.sell_indicator,
                 request.buy_threshold,
-                request.sell_threshold,
-                request.period
+                request.sell_threshold
             )
-            results["signals"].append(signal_data)
-            
-            # Update summary
-            if signal_data["signal"] == "BUY":
-                results["summary"]["buy_signals"] += 1
-            elif signal_data["signal"] == "SELL":
-                results["summary"]["sell_signals"] += 1
-            elif signal_data["signal"] == "HOLD":
-                results["summary"]["hold_signals"] += 1
-            else:
-                results["summary"]["failed_analyses"] += 1
-                
-        except Exception as e:
-            error_signal = {
+            for stock in request.stocks
+        ],
+        return_exceptions=True
+    )
+    
+    for stock, signal_data in zip(request.stocks, signals):
+        if isinstance(signal_data, Exception):
+            signal_data = {
                 "stock": stock,
                 "signal": "ERROR",
-                "error": str(e),
+                "error": str(signal_data),
                 "current_price": None,
                 "indicators": {},
-                "reasoning": f"Failed to analyze {stock}: {str(e)}"
+                "reasoning": f"Failed to analyze {stock}: {str(signal_data)}"
             }
-            results["signals"].append(error_signal)
-            results["summary"]["failed_analyses"] += 1
+        results["signals"].append(signal_data)
+    
+    # Update summary in one pass; anything not BUY/SELL/HOLD counts as failed
+    counts = Counter(s["signal"] for s in results["signals"])
+    buy, sell, hold = counts["BUY"], counts["SELL"], counts["HOLD"]
+    results["summary"].update(
+        buy_signals=buy,
+        sell_signals=sell,
+        hold_signals=hold,
+        failed_analyses=len(results["signals"]) - buy - sell - hold
+    )
     
     return results
 
 
+def _batch_signals(
+    frames: Dict[str, pd.DataFrame],
+    buy_indicator: str,
+    sell_indicator: str,
+    buy_threshold: Optional[float],
+    sell_threshold: Optional[float]
+) -> Dict[str, Tuple[SignalType, str, dict]]:
+    """
+    Compute current signals for all stocks whose histories can be stacked.
+    
+    Histories with the same number of bars and complete High/Low/Close data
+    are grouped, and each group's indicators are computed in one vectorized
+    pass. Stocks not covered here are analyzed individually.
+    """
+    groups = defaultdict(list)
+    for stock, df in frames.items():
+        if not df.empty and not np.isnan(df[["High", "Low", "Close"]].to_numpy(dtype=np.float64)).any():
+            groups[len(df)].append(stock)
+    
+    signals = {}
+    for stocks in groups.values():
+        if len(stocks) < 2:
+            continue
+        group_signals = signal_detector.get_current_signals_batch(
+            [frames[stock] for stock in stocks],
+            buy_indicator, sell_indicator, buy_threshold, sell_threshold
+        )
+        signals.update(zip(stocks, group_signals))
+    
+    return signals
+
+
+def _format_last_updated(frames: Dict[str, pd.DataFrame]) -> Dict[str, str]:
+    """
+    Format each history's last bar time, once per distinct timestamp.
+    
+    Histories from the same batch download usually end on the same bar.
+    """
+    formatted = {}
+    last_updated = {}
+    for stock, df in frames.items():
+        if df.empty:
+            continue
+        last_bar = df.index[-1]
+        if last_bar not in formatted:
+            formatted[last_bar] = last_bar.strftime("%Y-%m-%d %H:%M:%S")
+        last_updated[stock] = formatted[last_bar]
+    
+    return last_updated
+
+
+async def _analyze_async(
+    executor: Executor,
+    semaphore: asyncio.BoundedSemaphore,
+    df: Optional[pd.DataFrame],
+    signal: Optional[Tuple[SignalType, str, dict]],
+    last_updated: Optional[str],
+    stock: str,
+    buy_indicator: str,
+    sell_indicator: str,
+    buy_threshold: Optional[float],
+    sell_threshold: Optional[float]
+) -> Dict[str, Any]:
+    """Run _analyze_stock in the executor, bounded by the semaphore."""
+    if df is None or df.empty:
+        raise ValueError(f"No data available for {stock}")
+    
+    async with semaphore:
+        return await asyncio.get_running_loop().run_in_executor(
+            executor,
+            _analyze_stock,
+            df,
+            stock,
+            signal,
+            last_updated,
+            buy_indicator,
+            sell_indicator,
+            buy_threshold,
+            sell_threshold
+        )
+
+
 def _analyze_stock(
+    df: pd.DataFrame,
     stock: str,
+    signal: Optional[Tuple[SignalType, str, dict]],
+    last_updated: str,
     buy_indicator: str,
     sell_indicator: str,
     buy_threshold: float,
-    sell_threshold: float,
-    period: str
+    sell_threshold: float
 ) -> Dict[str, Any]:
-    """Analyze a single stock for current trading signals."""
-    # Fetch current data
-    ticker = yf.Ticker(stock)
-    df = ticker.history(period=period, interval="1d")
-    
-    if df.empty:
-        raise ValueError(f"No data available for {stock}")
+    """
+    Analyze a single stock's price history for current trading signals.
     
+    Uses the precomputed signal from the batch pass when available.
+    """
     # Get current price
-    current_price = df['Close'].iloc[-1]
+    current_price = float(df['Close'].to_numpy()[-1])
     
     # Get signal
-    signal_type, reasoning, indicators = signal_detector.get_current_signal(
-        df, buy_indicator, sell_indicator, buy_threshold, sell_threshold
-    )
+    if signal is None:
+        signal = signal_detector.get_current_signal(
+            df, buy_indicator, sell_indicator, buy_threshold, sell_threshold
+        )
+    signal_type, reasoning, indicators = signal
     
     return {
         "stock": stock,
@@ -126,39 +252,42 @@ def _analyze_stock(
         "current_price": round(current_price, 2),
         "indicators": indicators,
         "reasoning": reasoning,
-        "last_updated": df.index[-1].strftime("%Y-%m-%d %H:%M:%S")
+        "last_updated": last_updated
     }
 
 
-@router.get("/indicators")
-async def get_available_indicators() -> Dict[str, Any]:
-    """
-    Get information about available technical indicators.
-    """
-    return {
-        "available_indicators": ["macd", "kdj"],
-        "indicator_details": {
-            "macd": {
-                "name": "Moving Average Convergence Divergence",
-                "description": "Trend-following momentum indicator",
-                "buy_logic": "Histogram crosses above zero (golden cross)",
-                "sell_logic": "Histogram peaks and starts declining (peak detection - NEW in V2)",
-                "parameters": {
-                    "fast_period": 12,
-                    "slow_period": 26,
-                    "signal_period": 9
-                }
-            },
-            "kdj": {
-                "name": "Stochastic Oscillator (KDJ)",
-                "description": "Momentum indicator using Webull-style smoothing",
-                "buy_logic": "K and D both below threshold (default: 20)",
-                "sell_logic": "K and D both above threshold (default: 80)",
-                "parameters": {
-                    "k_period": 9,
-                    "smoothing": "2/3 previous + 1/3 current (Webull style)"
-                }
+# Indicator details are static; render them once at import
+_INDICATORS_BODY = render_json({
+    "available_indicators": ["macd", "kdj"],
+    "indicator_details": {
+        "macd": {
+            "name": "Moving Average Convergence Divergence",
+            "description": "Trend-following momentum indicator",
+            "buy_logic": "Histogram crosses above zero (golden cross)",
+            "sell_logic": "Histogram peaks and starts declining (peak detection - NEW in V2)",
+            "parameters": {
+                "fast_period": 12,
+                "slow_period": 26,
+                "signal_period": 9
+            }
+        },
+        "kdj": {
+            "name": "Stochastic Oscillator (KDJ)",
+            "description": "Momentum indicator using Webull-style smoothing",
+            "buy_logic": "K and D both below threshold (default: 20)",
+            "sell_logic": "K and D both above threshold (default: 80)",
+            "parameters": {
+                "k_period": 9,
+                "smoothing": "2/3 previous + 1/3 current (Webull style)"
             }
         }
     }
+})
+
 
+@router.get("/indicators")
+async def get_available_indicators() -> Response:
+    """
+    Get information about available technical indicators.
+    """
+    return static_json_response(_INDICATORS_BODY)
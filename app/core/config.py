@@ -12,10 +12,16 @@ class Settings(BaseSettings):
     initial_balance: float = 10000.0
     commission_rate: float = 0.001  # 0.1% per trade
     
-    # Rate limiting for stock fetching
-    rate_limit_delay: float = 0.1  # 100ms between requests
+    # Concurrency for stock fetching and analysis
     max_workers: int = 20
-    batch_size: int = 50
+    
+    # In-memory price history cache
+    price_cache_ttl: float = 60.0  # seconds
+    price_cache_maxsize: int = 4096
+    price_cache_dir: str = ".price_cache"  # daily parquet cache for scans; empty disables
+    
+    # Stocks database: days before the NASDAQ listing is refetched; 0 disables auto refresh
+    stocks_cache_ttl_days: float = 7.0
     
     class Config:
         env_file = ".env"
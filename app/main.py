@@ -8,17 +8,40 @@ Features:
 - Flexible filtering and sorting for market scans
 """
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.v1.endpoints.market_scanner import market_scanner
 from app.api.v1.router import api_router
 from app.core.config import settings
+from app.core.responses import ORJSONResponse
+from app.services.market_scanner import shutdown_process_pool, warm_up_kernels
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared executor for blocking work and shut down pools on exit."""
+    app.state.executor = ThreadPoolExecutor(max_workers=settings.max_workers)
+    # Bring a stale stocks database up to date without holding up the first scan
+    market_scanner.stock_fetcher.refresh_in_background()
+    # Compile indicator kernels before serving so the first request does not wait on them
+    await asyncio.get_running_loop().run_in_executor(app.state.executor, warm_up_kernels)
+    yield
+    app.state.executor.shutdown(wait=True)
+    shutdown_process_pool()
+
 
 app = FastAPI(
     title=settings.project_name,
     description="Lightweight stock trading signals API with MACD peak detection",
     version="2.0.0",
-    openapi_url=f"{settings.api_v1_str}/openapi.json"
+    openapi_url=f"{settings.api_v1_str}/openapi.json",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -66,7 +89,9 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=8001,  # Different port from V1
-        reload=True,
-        log_level="info"
+        reload=True,  # Development only; run without reload in production
+        log_level="info",
+        loop="uvloop",
+        http="httptools"
     )
 
@@ -4,8 +4,26 @@ Request Models
 Pydantic models for API request validation.
 """
 
-from typing import List, Optional
-from pydantic import BaseModel, Field, field_validator
+import re
+from operator import eq, ge, gt, le, lt, ne
+from typing import Any, Callable, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_validator
+
+
+# Allowed values, built once at import for O(1) membership checks
+_VALID_INDICATORS = frozenset({'macd', 'kdj'})
+_VALID_PERIODS = frozenset({'1mo', '3mo', '6mo', '1y', '2y', '5y'})
+_VALID_INTERVALS = frozenset({'1d', '1wk', '1mo'})
+_OPERATORS = {'<': lt, '>': gt, '<=': le, '>=': ge, '==': eq, '!=': ne}
+_VALID_OPERATORS = frozenset(_OPERATORS)
+_VALID_CAPS = frozenset({'mega_cap', 'large_cap', 'mid_cap', 'small_cap', 'micro_cap', 'all'})
+_VALID_ORDERS = frozenset({'asc', 'desc'})
+
+# Ticker symbols: letters, digits, '.' and '-' (e.g. BRK-B), optional '^' for indices
+_TICKER_RE = re.compile(r'^\^?[A-Z0-9.\-]{1,10}$')
+
+# Requests are immutable and reject unknown fields
+_REQUEST_CONFIG = ConfigDict(frozen=True, extra='forbid', str_strip_whitespace=True)
 
 
 class ExcludeRule(BaseModel):
@@ -15,6 +33,8 @@ class ExcludeRule(BaseModel):
     Example: {"field": "return_percentage", "operator": "<", "value": 10}
     This would exclude stocks with return_percentage less than 10%.
     """
+    model_config = _REQUEST_CONFIG
+    
     field: str = Field(
         ...,
         description="Field to check (e.g., return_percentage, success_rate)"
@@ -28,13 +48,23 @@ class ExcludeRule(BaseModel):
         description="Value to compare against"
     )
     
+    # Comparison function resolved once from the operator string
+    _compare: Callable[[Any, Any], bool] = PrivateAttr()
+    
     @field_validator('operator')
     @classmethod
     def validate_operator(cls, v):
-        valid_operators = ['<', '>', '<=', '>=', '==', '!=']
-        if v not in valid_operators:
-            raise ValueError(f"Operator must be one of: {valid_operators}")
+        if v not in _VALID_OPERATORS:
+            raise ValueError(f"Operator must be one of: {sorted(_VALID_OPERATORS)}")
         return v
+    
+    def model_post_init(self, __context: Any) -> None:
+        self._compare = _OPERATORS[self.operator]
+    
+    @property
+    def comparator(self) -> Callable[[Any, Any], bool]:
+        """Comparison function for the rule's operator."""
+        return self._compare
 
 
 class SortRule(BaseModel):
@@ -44,6 +74,8 @@ class SortRule(BaseModel):
     Example: {"field": "success_rate", "order": "desc"}
     Multiple rules can be provided for tie-breaking.
     """
+    model_config = _REQUEST_CONFIG
+    
     field: str = Field(
         ...,
         description="Field to sort by (e.g., success_rate, return_percentage)"
@@ -56,7 +88,7 @@ class SortRule(BaseModel):
     @field_validator('order')
     @classmethod
     def validate_order(cls, v):
-        if v.lower() not in ['asc', 'desc']:
+        if v.lower() not in _VALID_ORDERS:
             raise ValueError("Order must be 'asc' or 'desc'")
         return v.lower()
 
@@ -68,6 +100,8 @@ class MarketScanRequest(BaseModel):
     Scans the market for stocks based on technical indicators
     and applies filtering/sorting rules.
     """
+    model_config = _REQUEST_CONFIG
+    
     buy_indicator: str = Field(
         default="macd",
         description="Indicator for buy signals: macd or kdj"
@@ -119,29 +153,34 @@ class MarketScanRequest(BaseModel):
         default=None,
         description="Rules for sorting results (first = primary, rest = tie-breakers)"
     )
+    verbose: bool = Field(
+        default=False,
+        description="Return full trading_summary and statistics per stock instead of the sortable metrics"
+    )
+    early_exit: bool = Field(
+        default=False,
+        description="Stop scanning once the top results on the primary sort field stop changing; remaining stocks are skipped"
+    )
     
     @field_validator('buy_indicator', 'sell_indicator')
     @classmethod
     def validate_indicator(cls, v):
-        valid_indicators = ['macd', 'kdj']
-        if v.lower() not in valid_indicators:
-            raise ValueError(f"Indicator must be one of: {valid_indicators}")
+        if v.lower() not in _VALID_INDICATORS:
+            raise ValueError(f"Indicator must be one of: {sorted(_VALID_INDICATORS)}")
         return v.lower()
     
     @field_validator('period')
     @classmethod
     def validate_period(cls, v):
-        valid_periods = ['1mo', '3mo', '6mo', '1y', '2y', '5y']
-        if v not in valid_periods:
-            raise ValueError(f"Period must be one of: {valid_periods}")
+        if v not in _VALID_PERIODS:
+            raise ValueError(f"Period must be one of: {sorted(_VALID_PERIODS)}")
         return v
     
     @field_validator('interval')
     @classmethod
     def validate_interval(cls, v):
-        valid_intervals = ['1d', '1wk', '1mo']
-        if v not in valid_intervals:
-            raise ValueError(f"Interval must be one of: {valid_intervals}")
+        if v not in _VALID_INTERVALS:
+            raise ValueError(f"Interval must be one of: {sorted(_VALID_INTERVALS)}")
         return v
     
     @field_validator('market_cap')
@@ -149,10 +188,9 @@ class MarketScanRequest(BaseModel):
     def validate_market_cap(cls, v):
         if v is None:
             return v
-        valid_caps = ['mega_cap', 'large_cap', 'mid_cap', 'small_cap', 'micro_cap', 'all']
         for cap in v:
-            if cap not in valid_caps:
-                raise ValueError(f"Market cap must be one of: {valid_caps}")
+            if cap not in _VALID_CAPS:
+                raise ValueError(f"Market cap must be one of: {sorted(_VALID_CAPS)}")
         return v
 
 
@@ -162,6 +200,8 @@ class TradingSignalsRequest(BaseModel):
     
     Gets current trading signals for a list of stocks.
     """
+    model_config = _REQUEST_CONFIG
+    
     stocks: List[str] = Field(
         ...,
         min_length=1,
@@ -192,14 +232,16 @@ class TradingSignalsRequest(BaseModel):
     @field_validator('buy_indicator', 'sell_indicator')
     @classmethod
     def validate_indicator(cls, v):
-        valid_indicators = ['macd', 'kdj']
-        if v.lower() not in valid_indicators:
-            raise ValueError(f"Indicator must be one of: {valid_indicators}")
+        if v.lower() not in _VALID_INDICATORS:
+            raise ValueError(f"Indicator must be one of: {sorted(_VALID_INDICATORS)}")
         return v.lower()
     
     @field_validator('stocks')
     @classmethod
     def validate_stocks(cls, v):
-        # Convert to uppercase
-        return [s.upper() for s in v]
+        # Convert to uppercase and drop malformed symbols before any network request
+        stocks = [s for s in map(str.upper, v) if _TICKER_RE.match(s)]
+        if not stocks:
+            raise ValueError("No valid stock symbols provided")
+        return stocks
 
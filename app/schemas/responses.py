@@ -4,7 +4,7 @@ Response Models
 Pydantic models for API response serialization.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -42,11 +42,27 @@ class StockScanResult(BaseModel):
     statistics: TradingStatistics
 
 
+class StockScanMetrics(BaseModel):
+    """Sortable metrics for a single stock in a non-verbose market scan."""
+    stock: str
+    return_percentage: float
+    success_rate: float
+    total_trades: int
+    avg_days_between_trades: float
+    final_balance: float
+    total_return: float
+    avg_profit: float
+    avg_loss: float
+    max_profit: float
+    max_loss: float
+
+
 class ScanSummary(BaseModel):
     """Summary of the market scan operation."""
     total_stocks_scanned: int
     successful_scans: int
     failed_scans: int
+    skipped_scans: int = 0
     stocks_after_filters: int
     scan_criteria: Dict[str, Any]
 
@@ -54,7 +70,7 @@ class ScanSummary(BaseModel):
 class MarketScanResponse(BaseModel):
     """Response model for market scanner endpoint."""
     scan_summary: ScanSummary
-    top_results: List[StockScanResult]
+    top_results: List[Union[StockScanMetrics, StockScanResult]]
     metadata: Optional[Dict[str, Any]] = None
 
 
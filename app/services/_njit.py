@@ -0,0 +1,27 @@
+"""
+Numba JIT helpers.
+
+Exposes ``njit`` and ``prange`` from numba when it is installed. Without
+numba the decorator is a no-op and ``prange`` is ``range``, so decorated
+kernels still run as plain Python.
+"""
+
+import os
+
+try:
+    import numba
+    from numba import njit, prange
+    
+    # Once a parallel kernel has run on a worker thread, TBB's scheduler
+    # keeps the interpreter from exiting, so prefer OpenMP and workqueue;
+    # TBB stays last unless a threading layer is configured explicitly
+    if "NUMBA_THREADING_LAYER" not in os.environ and "NUMBA_THREADING_LAYER_PRIORITY" not in os.environ:
+        numba.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+except ImportError:  # pragma: no cover - numba is optional at runtime
+    prange = range
+    
+    def njit(*args, **kwargs):
+        # Support both @njit and @njit(...)
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
@@ -5,17 +5,273 @@ Scans the market for top performing stocks based on trading strategy.
 Supports flexible filtering (exclude rules) and multi-level sorting.
 """
 
-import time
-from typing import Dict, Any, List, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import heapq
+import multiprocessing
+import os
+from dataclasses import dataclass
+from functools import partial
+from numbers import Real
+from threading import Lock
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-import yfinance as yf
+import numpy as np
+import pandas as pd
 
+from app.services.price_cache import iter_histories
 from app.services.stock_fetcher import StockFetcher
 from app.services.trading_simulator import TradingSimulator
 from app.core.config import settings
 
 
+# Symbols per yfinance download request during a scan
+SCAN_CHUNK_SIZE = 20
+
+# Scans with fewer stocks simulate in threads; below this, pickling histories
+# to worker processes costs more than the extra cores save
+PROCESS_POOL_MIN_STOCKS = 32
+
+# Results used to estimate how selective each exclude rule is
+EXCLUDE_SAMPLE_SIZE = 32
+
+# With early exit, a scan stops after this many chunks in a row leave the top N unchanged
+EARLY_EXIT_PATIENCE = 3
+
+# Metrics returned per stock unless a scan asks for the full result
+SORTABLE_FIELDS = (
+    "return_percentage",
+    "success_rate",
+    "total_trades",
+    "avg_days_between_trades",
+    "final_balance",
+    "total_return",
+    "avg_profit",
+    "avg_loss",
+    "max_profit",
+    "max_loss"
+)
+
+
+@dataclass(frozen=True, slots=True)
+class ExcludeFilter:
+    """Validated exclude rule: drop stocks where compare(field value, value) holds."""
+    field: str
+    compare: Callable[[Any, Any], Any]
+    value: float
+    
+    def matches(self, field_value: Any) -> Any:
+        """Return True where field_value meets the rule (i.e. should be excluded)."""
+        return self.compare(field_value, self.value)
+
+
+@dataclass(frozen=True, slots=True)
+class SortKey:
+    """Validated sort rule for one result field."""
+    field: str
+    descending: bool = True
+
+
+def _scan_stock(
+    simulator: TradingSimulator,
+    symbol: str,
+    df: pd.DataFrame,
+    buy_indicator: str,
+    sell_indicator: str,
+    buy_threshold: Optional[float],
+    sell_threshold: Optional[float]
+) -> Dict[str, Any]:
+    """Simulate trading on a single stock's prefetched history."""
+    try:
+        if df.empty or len(df) < 50:
+            return {"error": f"Insufficient data for {symbol}"}
+        
+        # Simulate trading
+        result = simulator.simulate(
+            df, buy_indicator, sell_indicator,
+            buy_threshold, sell_threshold
+        )
+        
+        if "error" in result:
+            return result
+        
+        # Add stock symbol
+        result["stock"] = symbol.upper()
+        
+        # Remove detailed trades to reduce response size
+        result.pop("trades", None)
+        
+        # Flatten filter/sort metrics here, in the (possibly parallel) worker
+        result["_flat"] = _flatten_metrics(result)
+        
+        return result
+        
+    except Exception as e:
+        return {"error": f"Error scanning {symbol}: {str(e)}"}
+
+
+def _flatten_metrics(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge trading_summary and statistics into one metric lookup.
+    
+    A field's value is its trading_summary value, falling back to
+    statistics when that is missing or falsy.
+    """
+    summary = result["trading_summary"]
+    statistics = result["statistics"]
+    return {
+        field: summary.get(field) or statistics.get(field)
+        for field in summary.keys() | statistics.keys()
+    }
+
+
+class _TopTracker:
+    """
+    Running top N primary sort values of a scan, used to stop it early.
+    
+    Mirrors the final filtering and sorting: stocks below min_trades or
+    matched by an exclude rule are ignored, missing and non-numeric values
+    never match exclude rules and sort as 0, and a later stock only
+    displaces one it strictly beats, since ties keep scan order.
+    """
+    
+    def __init__(
+        self,
+        top_n: int,
+        min_trades: int,
+        exclude_rules: List[ExcludeFilter],
+        sort_key: SortKey
+    ):
+        self.top_n = top_n
+        self.min_trades = min_trades
+        self.exclude_rules = exclude_rules
+        self.sort_key = sort_key
+        self._heap: List[float] = []
+    
+    @property
+    def full(self) -> bool:
+        """Whether top_n qualifying stocks have been seen."""
+        return len(self._heap) >= self.top_n
+    
+    def offer(self, result: Optional[Dict[str, Any]]) -> bool:
+        """Add a scan result; return True if it entered the top N."""
+        if not result or "error" in result:
+            return False
+        if result["trading_summary"]["total_trades"] < self.min_trades:
+            return False
+        
+        flat = result["_flat"]
+        for rule in self.exclude_rules:
+            value = flat.get(rule.field)
+            if isinstance(value, Real) and rule.matches(value):
+                return False
+        
+        # Heap holds the top N with the worst at the root
+        score = flat.get(self.sort_key.field)
+        if not isinstance(score, Real):
+            score = 0
+        if not self.sort_key.descending:
+            score = -score
+        
+        if len(self._heap) < self.top_n:
+            heapq.heappush(self._heap, score)
+            return True
+        if score > self._heap[0]:
+            heapq.heapreplace(self._heap, score)
+            return True
+        return False
+
+
+def _completed_result(future: Future) -> Optional[Dict[str, Any]]:
+    """Wait for a scan future, returning None if it raised."""
+    try:
+        return future.result()
+    except Exception:
+        return None
+
+
+def _compact_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a scan result to its stock symbol and the sortable metrics."""
+    summary = result["trading_summary"]
+    statistics = result["statistics"]
+    compact = {"stock": result["stock"]}
+    for field in SORTABLE_FIELDS:
+        compact[field] = summary[field] if field in summary else statistics.get(field)
+    return compact
+
+
+def warm_up_kernels():
+    """
+    Compile the JIT indicator, signal and simulation kernels up front.
+    
+    Each kernel is compiled once per process for its argument types, or
+    loaded from numba's on-disk cache, and that costs far more than the
+    kernel itself. Running a small synthetic simulation and batch signal
+    pass at startup moves that cost out of the first request.
+    """
+    prices = 100 + 10 * np.sin(np.arange(60) / 4.0)
+    df = pd.DataFrame(
+        {"Open": prices, "High": prices + 1, "Low": prices - 1, "Close": prices},
+        index=pd.date_range("2000-01-03", periods=len(prices), freq="D")
+    )
+    
+    simulator = TradingSimulator()
+    for indicator in ("macd", "kdj"):
+        simulator.simulate(df, indicator, indicator)
+    simulator.signal_detector.get_current_signals_batch([df, df], "macd", "kdj")
+
+
+# Simulator owned by each worker process, created on first use
+_worker_simulator: Optional[TradingSimulator] = None
+
+
+def _scan_stock_in_worker(*args) -> Dict[str, Any]:
+    """Process pool entry point for _scan_stock."""
+    global _worker_simulator
+    if _worker_simulator is None:
+        _worker_simulator = TradingSimulator()
+    return _scan_stock(_worker_simulator, *args)
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared simulation process pool, starting it on first use."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # spawn avoids forking a process that already runs threads
+            _process_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_up_kernels
+            )
+        return _process_pool
+
+
+def _discard_process_pool(pool: ProcessPoolExecutor):
+    """Drop a broken process pool so the next scan starts a fresh one."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not pool:
+            return
+        _process_pool = None
+    print("Simulation process pool broke; falling back to in-process scanning")
+    pool.shutdown(wait=False)
+
+
+def shutdown_process_pool():
+    """Shut down the simulation process pool, if it was started."""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
 class MarketScanner:
     """
     Scans the market for stocks matching trading criteria.
@@ -24,18 +280,13 @@ class MarketScanner:
     - Scans multiple stocks concurrently
     - Applies exclude rules to filter results
     - Supports multi-level sorting
-    - Rate limiting to avoid API throttling
+    - Bulk price downloads with backoff on API throttling
     """
     
     def __init__(self):
         self.stock_fetcher = StockFetcher()
         self.trading_simulator = TradingSimulator()
         self.max_workers = settings.max_workers
-        self.batch_size = settings.batch_size
-        self.rate_limit_delay = settings.rate_limit_delay
-        self.timeout = 30
-        self.max_retries = 3
-        self.retry_delay = 2
     
     def scan(
         self,
@@ -49,8 +300,10 @@ class MarketScanner:
         stock_list: Optional[List[str]] = None,
         market_cap: Optional[List[str]] = None,
         top_n: int = 10,
-        exclude_rules: Optional[List[Dict[str, Any]]] = None,
-        sort_rules: Optional[List[Dict[str, str]]] = None
+        exclude_rules: Optional[List[ExcludeFilter]] = None,
+        sort_rules: Optional[List[SortKey]] = None,
+        verbose: bool = False,
+        early_exit: bool = False
     ) -> Dict[str, Any]:
         """
         Scan the market for top performing stocks.
@@ -67,7 +320,13 @@ class MarketScanner:
             market_cap: Market cap categories to scan
             top_n: Maximum number of results to return
             exclude_rules: Rules to filter out stocks
-            sort_rules: Rules for sorting results
+            sort_rules: Keys for sorting results
+            verbose: Return each stock's full trading_summary and statistics
+                instead of just the sortable metrics
+            early_exit: Stop downloading and simulating once EARLY_EXIT_PATIENCE
+                chunks in a row leave the top N on the primary sort key
+                unchanged; the remaining stocks are skipped, so results are
+                a heuristic best rather than exact
         
         Returns:
             Dictionary with scan results and metadata
@@ -86,25 +345,41 @@ class MarketScanner:
         
         print(f"Scanning {len(stocks_to_scan)} stocks...")
         
-        # Adjust rate limiting for large scans
-        self._adjust_rate_limiting(len(stocks_to_scan))
+        # Default sorting: by return_percentage descending
+        if not sort_rules:
+            sort_rules = [SortKey("return_percentage")]
+        
+        tracker = None
+        if early_exit and top_n and top_n > 0:
+            tracker = _TopTracker(top_n, min_trades, exclude_rules or [], sort_rules[0])
         
         # Scan stocks
-        results, successful, failed = self._scan_stocks(
+        results, successful, failed, skipped = self._scan_stocks(
             stocks_to_scan, buy_indicator, sell_indicator,
-            period, interval, buy_threshold, sell_threshold, min_trades
+            period, interval, buy_threshold, sell_threshold, min_trades, tracker
         )
         
+        # Filter and sort on columnar arrays, materializing only the top N
+        fields = {rule.field for rule in exclude_rules or []}
+        fields.update(key.field for key in sort_rules)
+        columns = self._build_columns(results, fields)
+        
         # Apply exclude rules
+        indices = np.arange(len(results))
         if exclude_rules:
-            results = self._apply_exclude_rules(results, exclude_rules)
+            indices = self._apply_exclude_rules(columns, exclude_rules, indices)
         
-        # Apply sorting
-        results = self._apply_sorting(results, sort_rules)
+        # Apply sorting, limited to top N
+        indices = self._apply_sorting(columns, sort_rules, indices, top_n if top_n and top_n > 0 else None)
         
-        # Limit to top N
-        if top_n and top_n > 0:
-            results = results[:top_n]
+        if verbose:
+            results = [results[i] for i in indices]
+            
+            # The flattened metrics are internal to filtering and sorting
+            for result in results:
+                result.pop("_flat", None)
+        else:
+            results = [_compact_result(results[i]) for i in indices]
         
         # Extract just the stock symbols for easy access
         top_stocks = [r["stock"] for r in results]
@@ -114,6 +389,7 @@ class MarketScanner:
                 "total_stocks_scanned": len(stocks_to_scan),
                 "successful_scans": successful,
                 "failed_scans": failed,
+                "skipped_scans": skipped,
                 "stocks_after_filters": len(results),
                 "scan_criteria": {
                     "buy_indicator": buy_indicator,
@@ -142,21 +418,6 @@ class MarketScanner:
         # Default to large cap stocks
         return self.stock_fetcher.get_large_cap_stocks()
     
-    def _adjust_rate_limiting(self, num_stocks: int):
-        """Adjust rate limiting parameters based on scan size."""
-        if num_stocks > 1000:
-            self.rate_limit_delay = 0.2
-            self.max_workers = 10
-            self.batch_size = 25
-        elif num_stocks > 500:
-            self.rate_limit_delay = 0.15
-            self.max_workers = 15
-            self.batch_size = 35
-        else:
-            self.rate_limit_delay = settings.rate_limit_delay
-            self.max_workers = settings.max_workers
-            self.batch_size = settings.batch_size
-    
     def _scan_stocks(
         self,
         stocks: List[str],
@@ -166,65 +427,120 @@ class MarketScanner:
         interval: str,
         buy_threshold: Optional[float],
         sell_threshold: Optional[float],
-        min_trades: int
-    ) -> Tuple[List[Dict[str, Any]], int, int]:
-        """Scan all stocks and return results."""
+        min_trades: int,
+        tracker: Optional[_TopTracker] = None
+    ) -> Tuple[List[Dict[str, Any]], int, int, int]:
+        """
+        Scan all stocks and return results.
+        
+        Histories are downloaded in bulk chunks, and each chunk's
+        simulations are submitted as soon as it arrives, so simulating one
+        chunk overlaps with downloading the next. Large scans simulate in
+        the shared process pool to use every core; small ones, and any scan
+        on a single-core host, use threads. If a pool worker dies, the rest
+        of the scan runs in threads and the next scan starts a fresh pool.
+        
+        With a tracker, each chunk's results are checked while the next
+        chunk downloads, and the scan stops once EARLY_EXIT_PATIENCE chunks
+        in a row leave the tracked top N unchanged. Stocks never simulated
+        because of that are counted as skipped rather than failed.
+        
+        Returns:
+            Tuple of (results, successful, failed, skipped)
+        """
         results = []
         successful = 0
         failed = 0
+        skipped = 0
         
-        # Process in batches for large scans
-        if len(stocks) > self.batch_size:
-            for i in range(0, len(stocks), self.batch_size):
-                batch = stocks[i:i + self.batch_size]
-                batch_results, batch_success, batch_failed = self._scan_batch(
-                    batch, buy_indicator, sell_indicator,
-                    period, interval, buy_threshold, sell_threshold, min_trades
-                )
-                results.extend(batch_results)
-                successful += batch_success
-                failed += batch_failed
-                
-                # Delay between batches
-                if i + self.batch_size < len(stocks):
-                    time.sleep(5)
+        positions = defaultdict(list)
+        for index, symbol in enumerate(stocks):
+            positions[symbol].append(index)
+        
+        thread_pool = None
+        if len(stocks) >= PROCESS_POOL_MIN_STOCKS and (os.cpu_count() or 1) > 1:
+            executor = _get_process_pool()
+            scan_stock = _scan_stock_in_worker
         else:
-            results, successful, failed = self._scan_batch(
-                stocks, buy_indicator, sell_indicator,
-                period, interval, buy_threshold, sell_threshold, min_trades
-            )
+            executor = thread_pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            scan_stock = partial(_scan_stock, self.trading_simulator)
         
-        return results, successful, failed
-    
-    def _scan_batch(
-        self,
-        stocks: List[str],
-        buy_indicator: str,
-        sell_indicator: str,
-        period: str,
-        interval: str,
-        buy_threshold: Optional[float],
-        sell_threshold: Optional[float],
-        min_trades: int
-    ) -> Tuple[List[Dict[str, Any]], int, int]:
-        """Scan a batch of stocks concurrently."""
-        results = []
-        successful = 0
-        failed = 0
+        histories = {}
+        futures: List[Optional[Future]] = [None] * len(stocks)
+        stopped_early = False
+        
+        def fall_back_to_threads():
+            # A worker died and broke the pool; scan the rest in-process and
+            # let the next scan start a fresh pool
+            nonlocal executor, scan_stock, thread_pool
+            if thread_pool is None:
+                _discard_process_pool(executor)
+                executor = thread_pool = ThreadPoolExecutor(max_workers=self.max_workers)
+                scan_stock = partial(_scan_stock, self.trading_simulator)
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {
-                executor.submit(
-                    self._scan_single_stock,
-                    symbol, buy_indicator, sell_indicator,
-                    period, interval, buy_threshold, sell_threshold
-                ): symbol for symbol in stocks
-            }
+        def submit(index: int, symbol: str):
+            args = (
+                symbol, histories[symbol], buy_indicator, sell_indicator,
+                buy_threshold, sell_threshold
+            )
+            try:
+                futures[index] = executor.submit(scan_stock, *args)
+            except BrokenProcessPool:
+                fall_back_to_threads()
+                futures[index] = executor.submit(scan_stock, *args)
+        
+        try:
+            batches = iter_histories(
+                stocks, period, interval, chunk_size=SCAN_CHUNK_SIZE, persist=True
+            )
+            previous_chunk: List[int] = []
+            unchanged_chunks = 0
             
-            for future in as_completed(futures):
-                symbol = futures[future]
+            for frames in batches:
+                histories.update(frames)
+                chunk = []
+                for symbol in frames:
+                    for index in positions[symbol]:
+                        submit(index, symbol)
+                        chunk.append(index)
+                
+                if tracker is not None:
+                    # The previous chunk simulated while this one downloaded
+                    changed = False
+                    for index in previous_chunk:
+                        # Rescan stocks lost to a broken pool, so they do not
+                        # look like unchanged results
+                        if isinstance(futures[index].exception(), BrokenProcessPool):
+                            fall_back_to_threads()
+                            submit(index, stocks[index])
+                        if tracker.offer(_completed_result(futures[index])):
+                            changed = True
+                    previous_chunk = chunk
+                    
+                    unchanged_chunks = 0 if changed else unchanged_chunks + 1
+                    if tracker.full and unchanged_chunks >= EARLY_EXIT_PATIENCE:
+                        print(f"Top {tracker.top_n} unchanged for {unchanged_chunks} chunks; stopping scan early")
+                        batches.close()
+                        stopped_early = True
+                        break
+            
+            # Collect in scan order regardless of completion order, so sort ties are stable
+            for symbol, future in zip(stocks, futures):
+                if future is None:
+                    if stopped_early:
+                        skipped += 1
+                    else:
+                        failed += 1
+                    continue
                 try:
-                    result = future.result(timeout=self.timeout)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        fall_back_to_threads()
+                        result = _scan_stock(
+                            self.trading_simulator, symbol, histories[symbol],
+                            buy_indicator, sell_indicator, buy_threshold, sell_threshold
+                        )
                     if result and "error" not in result:
                         if result["trading_summary"]["total_trades"] >= min_trades:
                             results.append(result)
@@ -236,155 +552,108 @@ class MarketScanner:
                 except Exception as e:
                     print(f"Error scanning {symbol}: {e}")
                     failed += 1
+        finally:
+            if thread_pool is not None:
+                thread_pool.shutdown()
         
-        return results, successful, failed
+        return results, successful, failed, skipped
     
-    def _scan_single_stock(
+    def _build_columns(
         self,
-        symbol: str,
-        buy_indicator: str,
-        sell_indicator: str,
-        period: str,
-        interval: str,
-        buy_threshold: Optional[float],
-        sell_threshold: Optional[float]
-    ) -> Optional[Dict[str, Any]]:
-        """Scan a single stock with retry logic."""
-        for attempt in range(self.max_retries):
-            try:
-                time.sleep(self.rate_limit_delay)
-                
-                # Fetch historical data
-                ticker = yf.Ticker(symbol)
-                df = ticker.history(period=period, interval=interval, auto_adjust=True)
-                
-                if df.empty or len(df) < 50:
-                    return {"error": f"Insufficient data for {symbol}"}
-                
-                # Simulate trading
-                result = self.trading_simulator.simulate(
-                    df, buy_indicator, sell_indicator,
-                    buy_threshold, sell_threshold
-                )
-                
-                if "error" in result:
-                    return result
-                
-                # Add stock symbol
-                result["stock"] = symbol.upper()
-                
-                # Remove detailed trades to reduce response size
-                result.pop("trades", None)
-                
-                return result
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                if "rate limit" in error_msg or "too many requests" in error_msg:
-                    if attempt < self.max_retries - 1:
-                        time.sleep(self.retry_delay)
-                        continue
-                return {"error": f"Error scanning {symbol}: {str(e)}"}
-        
-        return {"error": f"Failed to scan {symbol} after {self.max_retries} attempts"}
+        results: List[Dict[str, Any]],
+        fields: Iterable[str]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Extract metric fields from scan results into float64 arrays.
+        
+        Values are read from each result's flattened metrics; missing and
+        non-numeric values (e.g. buy_indicator) become NaN, so rules on them
+        never exclude and sort as 0.
+        """
+        fields = list(fields)
+        matrix = np.empty((len(fields), len(results)), dtype=np.float64)
+        
+        # One pass over the results fills every field's row
+        for i, result in enumerate(results):
+            flat = result["_flat"]
+            for j, field in enumerate(fields):
+                value = flat.get(field)
+                matrix[j, i] = value if isinstance(value, Real) else np.nan
+        
+        return dict(zip(fields, matrix))
     
     def _apply_exclude_rules(
         self,
-        results: List[Dict[str, Any]],
-        rules: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
+        columns: Dict[str, np.ndarray],
+        rules: List[ExcludeFilter],
+        indices: np.ndarray
+    ) -> np.ndarray:
         """
-        Apply exclude rules to filter results.
+        Apply exclude rules, most selective first.
         
-        Each rule has: field, operator, value
-        Operators: <, >, <=, >=, ==, !=
+        Each rule has: field, compare, value
+        A stock is excluded if any rule matches it; rules are skipped for
+        stocks missing the field. Each rule's exclude rate is estimated on a
+        small sample so later rules only see the stocks still remaining.
+        
+        Returns:
+            Indices of results that pass every rule
         """
-        filtered = []
+        def excluded(rule: ExcludeFilter, rows: np.ndarray) -> np.ndarray:
+            values = columns[rule.field][rows]
+            return ~np.isnan(values) & rule.matches(values)
         
-        for result in results:
-            exclude = False
-            summary = result.get("trading_summary", {})
-            stats = result.get("statistics", {})
-            
-            for rule in rules:
-                field = rule.get("field", "")
-                operator = rule.get("operator", "")
-                value = rule.get("value", 0)
-                
-                # Get field value from summary or statistics
-                field_value = summary.get(field) or stats.get(field)
-                
-                if field_value is None:
-                    continue
-                
-                # Apply operator
-                if self._evaluate_condition(field_value, operator, value):
-                    exclude = True
-                    break
-            
-            if not exclude:
-                filtered.append(result)
+        sample = indices[:EXCLUDE_SAMPLE_SIZE]
+        rules = sorted(rules, key=lambda rule: -np.count_nonzero(excluded(rule, sample)))
         
-        return filtered
-    
-    def _evaluate_condition(self, field_value: float, operator: str, value: float) -> bool:
-        """Evaluate a condition (returns True if should be EXCLUDED)."""
-        try:
-            if operator == "<":
-                return field_value < value
-            elif operator == ">":
-                return field_value > value
-            elif operator == "<=":
-                return field_value <= value
-            elif operator == ">=":
-                return field_value >= value
-            elif operator == "==":
-                return field_value == value
-            elif operator == "!=":
-                return field_value != value
-            return False
-        except (TypeError, ValueError):
-            return False
+        for rule in rules:
+            if len(indices) == 0:
+                break
+            indices = indices[~excluded(rule, indices)]
+        
+        return indices
     
     def _apply_sorting(
         self,
-        results: List[Dict[str, Any]],
-        sort_rules: Optional[List[Dict[str, str]]]
-    ) -> List[Dict[str, Any]]:
+        columns: Dict[str, np.ndarray],
+        sort_rules: List[SortKey],
+        indices: np.ndarray,
+        top_n: Optional[int] = None
+    ) -> np.ndarray:
         """
-        Apply multi-level sorting to results.
+        Apply multi-level sorting to the selected results.
         
-        Each rule has: field, order (asc/desc)
+        Each key names a field and whether it sorts descending.
         First rule is primary sort, subsequent rules are tie-breakers.
+        Missing values sort as 0, and ties keep scan order.
+        
+        When top_n is given, only the top_n results are returned; stocks that
+        cannot reach the top_n on the primary key are dropped with a linear
+        partition before the full sort.
+        
+        Returns:
+            Indices of results in sorted order
         """
-        if not results:
-            return results
+        if len(indices) == 0:
+            return indices
         
-        # Default sorting: by return_percentage descending
-        if not sort_rules:
-            sort_rules = [{"field": "return_percentage", "order": "desc"}]
+        # (rules, results) key matrix with desc keys negated; np.lexsort uses
+        # its last row as the primary key, so rules are stacked in reverse
+        rules = sort_rules[::-1]
+        signs = np.array([-1.0 if key.descending else 1.0 for key in rules])
+        keys = np.stack([columns[key.field] for key in rules])[:, indices]
+        keys = np.nan_to_num(keys, nan=0.0) * signs[:, None]
         
-        def get_sort_key(item: Dict[str, Any]) -> tuple:
-            """Generate a tuple key for sorting."""
-            key_parts = []
-            summary = item.get("trading_summary", {})
-            stats = item.get("statistics", {})
-            
-            for rule in sort_rules:
-                field = rule.get("field", "")
-                order = rule.get("order", "desc").lower()
-                
-                value = summary.get(field) or stats.get(field) or 0
-                
-                # Negate for descending order
-                if order == "desc":
-                    value = -value if isinstance(value, (int, float)) else value
-                
-                key_parts.append(value)
-            
-            return tuple(key_parts)
+        if top_n and top_n < len(indices):
+            # Keep everything tied with the top_n-th primary value so
+            # tie-breakers still decide between them
+            primary = keys[-1]
+            cutoff = np.partition(primary, top_n - 1)[top_n - 1]
+            candidates = primary <= cutoff
+            indices = indices[candidates]
+            keys = keys[:, candidates]
         
-        return sorted(results, key=get_sort_key)
+        return indices[np.lexsort(keys)][:top_n or None]
     
     def get_scan_criteria_options(self) -> Dict[str, Any]:
         """Return available options for scan criteria."""
@@ -393,18 +662,7 @@ class MarketScanner:
             "periods": ["1mo", "3mo", "6mo", "1y", "2y"],
             "intervals": ["1d", "1wk"],
             "market_cap_options": ["mega_cap", "large_cap", "mid_cap", "small_cap", "micro_cap", "all"],
-            "sortable_fields": [
-                "return_percentage",
-                "success_rate",
-                "total_trades",
-                "avg_days_between_trades",
-                "final_balance",
-                "total_return",
-                "avg_profit",
-                "avg_loss",
-                "max_profit",
-                "max_loss"
-            ],
+            "sortable_fields": list(SORTABLE_FIELDS),
             "exclude_operators": ["<", ">", "<=", ">=", "==", "!="]
         }
 
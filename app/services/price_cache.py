@@ -0,0 +1,329 @@
+"""
+Price Cache Service
+
+Fetches historical price data from yfinance and keeps it in an in-process
+TTL cache keyed by (symbol, period, interval), so repeated requests for the
+same history within the TTL are served from memory instead of Yahoo.
+Callers that can tolerate data up to a day old, such as backtesting scans,
+can also persist histories to a parquet cache on disk that lasts for the
+calendar day. All requests go through one shared HTTP session so
+connections are reused.
+"""
+
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from threading import RLock
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+from cachetools import TTLCache
+from curl_cffi import requests as curl_requests
+
+from app.core.config import settings
+
+
+# Yahoo handles small multi-symbol requests best; larger lists are split
+DOWNLOAD_CHUNK_SIZE = 10
+
+# Rate-limited chunks are retried with exponential backoff
+MAX_RETRIES = 3
+RETRY_DELAY = 2  # seconds, doubled on each retry
+
+# After throttling, the chunk size grows back by one per this many downloaded symbols
+SYMBOLS_PER_CHUNK_INCREASE = 50
+
+# Indicators and the simulator only read prices; volume and corporate actions are dropped
+PRICE_COLUMNS = ["Open", "High", "Low", "Close"]
+
+# Cached DataFrames are shared by reference - callers must not mutate them
+_cache = TTLCache(maxsize=settings.price_cache_maxsize, ttl=settings.price_cache_ttl)
+_lock = RLock()
+
+# yf.download resets and then polls module-level result dicts, so two
+# downloads in the process at once would mix up each other's results
+_download_lock = threading.Lock()
+
+# Characters allowed in disk cache file names
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9.^=-]")
+
+# Disk cache files live in one YYYYMMDD directory per day
+_DAY_DIR_NAME = re.compile(r"^\d{8}$")
+
+# Shared by every Yahoo request in the process, including StockFetcher's
+# market cap lookups. yfinance requires a curl_cffi session; yf.download
+# otherwise installs a fresh one on every call. Connections are kept per
+# thread and reused across calls.
+yahoo_session = curl_requests.Session(impersonate="chrome")
+
+
+class _ChunkSizeLimit:
+    """
+    Adaptive cap on symbols per download request, shared by all callers.
+    
+    Yahoo throttles by request volume, so a rate-limited response halves
+    the cap and every SYMBOLS_PER_CHUNK_INCREASE symbols downloaded
+    successfully raise it by one (additive increase, multiplicative
+    decrease). Once the cap grows back past the requested chunk size the
+    limit is lifted.
+    """
+    
+    def __init__(self):
+        self._limit: Optional[int] = None
+        self._downloaded = 0
+        self._lock = threading.Lock()
+    
+    def size(self, chunk_size: int) -> int:
+        """Chunk size to use for the next request."""
+        with self._lock:
+            if self._limit is None:
+                return chunk_size
+            return min(self._limit, chunk_size)
+    
+    def record_success(self, symbols: int, chunk_size: int):
+        """Count downloaded symbols, growing the cap as they add up."""
+        with self._lock:
+            if self._limit is None:
+                return
+            self._downloaded += symbols
+            while self._downloaded >= SYMBOLS_PER_CHUNK_INCREASE and self._limit is not None:
+                self._downloaded -= SYMBOLS_PER_CHUNK_INCREASE
+                self._limit += 1
+                if self._limit >= chunk_size:
+                    self._limit = None
+    
+    def record_rate_limited(self, size: int):
+        """Halve the cap after a request of size symbols was throttled."""
+        with self._lock:
+            limit = size if self._limit is None else min(self._limit, size)
+            self._limit = max(1, limit // 2)
+            self._downloaded = 0
+
+
+_chunk_size_limit = _ChunkSizeLimit()
+
+
+def _get_cached(key: tuple):
+    with _lock:
+        return _cache.get(key)
+
+
+def _set_cached(key: tuple, df: pd.DataFrame):
+    # Only keep real data so transient failures are retried on the next call
+    if df is not None and not df.empty:
+        with _lock:
+            _cache[key] = df
+
+
+def _disk_path(key: tuple) -> Optional[Path]:
+    """Path of the disk cache file for key today, or None if disabled."""
+    if not settings.price_cache_dir:
+        return None
+    name = _UNSAFE_FILENAME_CHARS.sub("_", "_".join(key)) + ".parquet"
+    return Path(settings.price_cache_dir) / date.today().strftime("%Y%m%d") / name
+
+
+def _read_disk(key: tuple) -> Optional[pd.DataFrame]:
+    path = _disk_path(key)
+    if path is None or not path.exists():
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"Error reading cached prices {path}: {e}")
+        return None
+
+
+def _write_disk(key: tuple, df: pd.DataFrame):
+    path = _disk_path(key)
+    if path is None or df.empty:
+        return
+    try:
+        day_dir = path.parent
+        if not day_dir.exists():
+            # A new day starts: earlier days' files are stale. Only day
+            # directories are removed, in case the cache dir is shared
+            if day_dir.parent.exists():
+                for old_dir in day_dir.parent.iterdir():
+                    if _DAY_DIR_NAME.match(old_dir.name) and old_dir.name < day_dir.name and old_dir.is_dir():
+                        shutil.rmtree(old_dir, ignore_errors=True)
+            day_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Write then rename so readers never see a partial file
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        df.to_parquet(tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Error caching prices to {path}: {e}")
+
+
+def _price_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep only the price columns, so cached frames stay small."""
+    if df.empty:
+        return df
+    return df[PRICE_COLUMNS]
+
+
+def _is_rate_limited(error) -> bool:
+    """Check whether a yfinance error means Yahoo is throttling requests."""
+    message = str(error).lower()
+    return "rate limit" in message or "too many requests" in message
+
+
+def _download_chunk(chunk: List[str], period: str, interval: str) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+    """
+    Download one chunk of symbols and split the result per symbol.
+    
+    Returns:
+        Tuple of (frames, errors): OHLC DataFrames by symbol, and the
+        error messages yfinance recorded for symbols that failed
+    """
+    with _download_lock:
+        data = yf.download(
+            tickers=" ".join(chunk),
+            period=period,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+            session=yahoo_session
+        )
+        # yf.download records per-symbol failures instead of raising
+        errors = {symbol: str(error) for symbol, error in yf.shared._ERRORS.items()}
+    
+    frames = {}
+    if data is None or data.empty:
+        return frames, errors
+    
+    tickers = data.columns.get_level_values(0)
+    for symbol in chunk:
+        if symbol in tickers:
+            # Rows are aligned across the chunk; drop the ones this symbol lacks
+            df = _price_columns(data[symbol].dropna(how="all"))
+            if not df.empty:
+                frames[symbol] = df
+    
+    return frames, errors
+
+
+def iter_histories(
+    symbols: List[str],
+    period: str,
+    interval: str,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    persist: bool = False
+) -> Iterator[Dict[str, pd.DataFrame]]:
+    """
+    Yield price histories for many symbols as each batch becomes available.
+    
+    Cached symbols are yielded first in one batch; with persist, symbols
+    missing from memory are also looked up in today's disk cache and
+    downloads are written to it. The rest are requested in
+    chunks of chunk_size symbols and yielded chunk by chunk, so callers can
+    process earlier chunks while later ones download. yf.download keeps its
+    results in module-level state, so downloads are serialized across the
+    whole process - concurrent scans and signal requests take turns chunk
+    by chunk - and each chunk is still fetched with yfinance's own threads.
+    Symbols that fail because of rate limiting are retried with exponential
+    backoff, and throttling shrinks later chunks until downloads succeed
+    again.
+    
+    Args:
+        symbols: List of stock symbols
+        period: Data period (e.g., '1mo', '3mo')
+        interval: Data interval (e.g., '1d')
+        chunk_size: Maximum number of symbols per download request; fewer
+            are sent while Yahoo is throttling
+        persist: Use the daily disk cache; the data may be up to a day old
+    
+    Yields:
+        Dictionaries mapping symbol to its OHLC DataFrame; symbols without
+        data are never yielded
+    """
+    cached = {}
+    missing = []
+    
+    for symbol in dict.fromkeys(symbols):
+        key = (symbol, period, interval)
+        df = _get_cached(key)
+        if df is None and persist:
+            # Not promoted to memory, which callers without persist also read
+            df = _read_disk(key)
+        if df is not None:
+            cached[symbol] = df
+        else:
+            missing.append(symbol)
+    
+    if cached:
+        yield cached
+    
+    start = 0
+    while start < len(missing):
+        size = _chunk_size_limit.size(chunk_size)
+        chunk = missing[start:start + size]
+        start += size
+        
+        for attempt in range(MAX_RETRIES):
+            rate_limited = False
+            try:
+                chunk_frames, errors = _download_chunk(chunk, period, interval)
+            except Exception as e:
+                if not _is_rate_limited(e):
+                    print(f"Error downloading {chunk}: {e}")
+                    break
+                chunk_frames, errors = {}, {}
+                rate_limited = True
+            
+            for symbol, df in chunk_frames.items():
+                _set_cached((symbol, period, interval), df)
+                if persist:
+                    _write_disk((symbol, period, interval), df)
+            if chunk_frames:
+                _chunk_size_limit.record_success(len(chunk_frames), chunk_size)
+                yield chunk_frames
+            
+            chunk = [symbol for symbol in chunk if symbol not in chunk_frames]
+            if not chunk:
+                break
+            
+            rate_limited = rate_limited or any(_is_rate_limited(errors.get(symbol, "")) for symbol in chunk)
+            if not rate_limited:
+                break
+            
+            # Later chunks go out smaller until Yahoo stops throttling
+            _chunk_size_limit.record_rate_limited(size)
+            
+            if attempt < MAX_RETRIES - 1:
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+
+
+def fetch_histories(
+    symbols: List[str],
+    period: str,
+    interval: str,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE
+) -> Dict[str, pd.DataFrame]:
+    """
+    Get price histories for many symbols with batched yfinance requests.
+    
+    See iter_histories for how symbols are cached, chunked and retried.
+    
+    Args:
+        symbols: List of stock symbols
+        period: Data period (e.g., '1mo', '3mo')
+        interval: Data interval (e.g., '1d')
+        chunk_size: Maximum number of symbols per download request
+    
+    Returns:
+        Dictionary mapping symbol to its OHLC DataFrame (missing if no data)
+    """
+    frames = {}
+    for batch in iter_histories(symbols, period, interval, chunk_size):
+        frames.update(batch)
+    return frames
@@ -10,9 +10,10 @@ Key difference from V1:
 
 import pandas as pd
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import List, Optional, Sequence, Tuple
 from enum import Enum
 
+from app.services._njit import njit
 from app.services.technical_analysis import TechnicalAnalysis
 
 
@@ -29,6 +30,72 @@ class IndicatorType(Enum):
     KDJ = "kdj"
 
 
+# Indicator codes for the signal kernel
+_NO_INDICATOR = 0
+_MACD = 1
+_KDJ = 2
+
+
+def _indicator_code(indicator: str) -> int:
+    """Map an indicator name to its signal kernel code."""
+    indicator = indicator.lower()
+    if indicator == 'macd':
+        return _MACD
+    if indicator == 'kdj':
+        return _KDJ
+    return _NO_INDICATOR
+
+
+@njit(cache=True)
+def _signals_kernel(
+    macd_histogram: np.ndarray,
+    kdj_high: np.ndarray,
+    kdj_low: np.ndarray,
+    buy_code: int,
+    sell_code: int,
+    buy_threshold: float,
+    sell_threshold: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    JIT-compiled buy/sell signals for every bar, matching the single-bar checks.
+    
+    kdj_high and kdj_low are the per-bar larger and smaller of K and D, so
+    "K and D both below/above threshold" is a single comparison. Comparisons
+    involving NaN are False, so bars with missing indicator values never
+    signal. Compiled without fastmath to keep those semantics.
+    """
+    n = len(macd_histogram)
+    buy = np.zeros(n, dtype=np.int8)
+    sell = np.zeros(n, dtype=np.int8)
+    
+    for i in range(n):
+        if buy_code == _MACD:
+            # Golden cross: yesterday < 0 and today > 0
+            if i >= 1 and macd_histogram[i - 1] < 0 and macd_histogram[i] > 0:
+                buy[i] = 1
+        elif buy_code == _KDJ:
+            if kdj_high[i] < buy_threshold:
+                buy[i] = 1
+        
+        if sell_code == _MACD:
+            # Peak: was rising, now declining, in positive territory
+            if i >= 2:
+                yesterday = macd_histogram[i - 1]
+                if macd_histogram[i - 2] < yesterday and yesterday > macd_histogram[i] and yesterday > 0:
+                    sell[i] = 1
+        elif sell_code == _KDJ:
+            if kdj_low[i] > sell_threshold:
+                sell[i] = 1
+    
+    return buy, sell
+
+
+def _round_or_none(value: float, digits: int) -> Optional[float]:
+    """Round an indicator value for output, mapping NaN to None."""
+    value = float(value)
+    return round(value, digits) if value == value else None
+
+
 class SignalDetector:
     """
     Detects trading signals based on technical indicators.
@@ -53,8 +120,9 @@ class SignalDetector:
         buy_indicator: str,
         sell_indicator: str,
         buy_threshold: Optional[float] = None,
-        sell_threshold: Optional[float] = None
-    ) -> Tuple[List[int], List[int]]:
+        sell_threshold: Optional[float] = None,
+        indicators: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
         Generate buy and sell signals for the entire DataFrame.
         
@@ -64,73 +132,137 @@ class SignalDetector:
             sell_indicator: Indicator for sell signals ('macd' or 'kdj')
             buy_threshold: Custom threshold for KDJ buy (default: 20)
             sell_threshold: Custom threshold for KDJ sell (default: 80)
+            indicators: df's get_indicator_arrays result, for callers that
+                try several indicator or threshold choices on one frame;
+                computed from df when omitted
         
         Returns:
-            Tuple of (buy_signals, sell_signals) as lists of 0/1
+            Tuple of (buy_signals, sell_signals) as int8 arrays of 0/1;
+            call .tolist() where plain lists are needed
+        """
+        return self._signal_arrays(
+            df, buy_indicator, sell_indicator, buy_threshold, sell_threshold, indicators
+        )
+    
+    def _signal_arrays(
+        self,
+        df: pd.DataFrame,
+        buy_indicator: str,
+        sell_indicator: str,
+        buy_threshold: Optional[float],
+        sell_threshold: Optional[float],
+        indicators: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Buy and sell signals for every bar of df as int8 arrays of 0/1."""
+        if indicators is None:
+            indicators = self.get_indicator_arrays(df)
+        histogram, kdj_high, kdj_low = indicators
+        
+        # Evaluate every bar in one compiled pass
+        return _signals_kernel(
+            histogram, kdj_high, kdj_low,
+            _indicator_code(buy_indicator),
+            _indicator_code(sell_indicator),
+            float(buy_threshold if buy_threshold is not None else self.kdj_buy_threshold),
+            float(sell_threshold if sell_threshold is not None else self.kdj_sell_threshold)
+        )
+    
+    def get_indicator_arrays(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        # Calculate indicators
-        macd_histogram = self.technical_analysis.get_macd_histogram_series(df)
-        kdj_result = self.technical_analysis.get_kdj_series(df)
+        Compute the signal inputs for df: the MACD histogram and the per-bar
+        max and min of KDJ K and D.
+        
+        Callers that generate signals for several indicator or threshold
+        choices on the same frame can compute these once and pass them to
+        generate_signals. They are not cached, so a frame changed in place
+        gets fresh signals on the next call.
         
+        Indicators that cannot be calculated are all-NaN arrays; np.maximum
+        and np.minimum propagate NaN, so a bar missing K or D stays NaN.
+        """
+        # Calculate indicators as plain arrays; thresholds are applied later
+        # by the signal kernel, so one computation serves every threshold
+        macd_histogram = self.technical_analysis.calculate_macd_histogram(
+            df['Close'].to_numpy(dtype=np.float64)
+        )
+        kdj_result = self.technical_analysis.calculate_kdj_arrays(df)
+        
+        nan_series = np.full(len(df), np.nan)
+        histogram = nan_series if macd_histogram is None else macd_histogram
         if kdj_result is None:
-            kdj_k = pd.Series([np.nan] * len(df), index=df.index)
-            kdj_d = pd.Series([np.nan] * len(df), index=df.index)
+            kdj_k = kdj_d = nan_series
         else:
-            kdj_k, kdj_d, _ = kdj_result
+            kdj_k, kdj_d = kdj_result
         
-        if macd_histogram is None:
-            macd_histogram = pd.Series([np.nan] * len(df), index=df.index)
+        return histogram, np.maximum(kdj_k, kdj_d), np.minimum(kdj_k, kdj_d)
+    
+    def update(
+        self,
+        histogram_tail: Sequence[float],
+        kdj_k: float,
+        kdj_d: float,
+        buy_indicator: str,
+        sell_indicator: str,
+        buy_threshold: Optional[float] = None,
+        sell_threshold: Optional[float] = None
+    ) -> Tuple[bool, bool]:
+        """
+        Check buy and sell signals on the newest bar from its indicator tail.
         
-        buy_signals = []
-        sell_signals = []
+        Signals only look back two bars, so callers polling a growing series
+        can keep the last three MACD histogram values (e.g. in a
+        deque(maxlen=3)) and the latest K and D, and check each new bar in
+        constant time instead of re-evaluating the whole history.
         
-        for i in range(len(df)):
-            buy_signal = self._check_buy_signal(
-                i, buy_indicator, macd_histogram, kdj_k, kdj_d, buy_threshold
-            )
-            sell_signal = self._check_sell_signal(
-                i, sell_indicator, macd_histogram, kdj_k, kdj_d, sell_threshold
-            )
-            
-            buy_signals.append(1 if buy_signal else 0)
-            sell_signals.append(1 if sell_signal else 0)
+        Args:
+            histogram_tail: Last (up to) three MACD histogram values, oldest first
+            kdj_k: Latest KDJ K value
+            kdj_d: Latest KDJ D value
+            buy_indicator: Indicator for buy signals ('macd' or 'kdj')
+            sell_indicator: Indicator for sell signals ('macd' or 'kdj')
+            buy_threshold: Custom KDJ buy threshold (default: 20)
+            sell_threshold: Custom KDJ sell threshold (default: 80)
         
-        return buy_signals, sell_signals
+        Returns:
+            Tuple of (is_buy, is_sell)
+        """
+        is_buy = self._check_buy_signal(buy_indicator.lower(), histogram_tail, kdj_k, kdj_d, buy_threshold)
+        is_sell = self._check_sell_signal(sell_indicator.lower(), histogram_tail, kdj_k, kdj_d, sell_threshold)
+        return is_buy, is_sell
     
     def _check_buy_signal(
         self,
-        index: int,
         indicator: str,
-        macd_histogram: pd.Series,
-        kdj_k: pd.Series,
-        kdj_d: pd.Series,
+        histogram_tail: Sequence[float],
+        k_val: float,
+        d_val: float,
         threshold: Optional[float]
     ) -> bool:
         """
-        Check if there's a buy signal at the given index.
+        Check if there's a buy signal on the last bar of histogram_tail.
+        
+        indicator must already be lowercase.
         
         MACD Buy: Histogram crosses above zero (yesterday < 0, today > 0)
         KDJ Buy: K and D both below threshold
         """
-        if indicator.lower() == 'macd':
+        if indicator == 'macd':
             # Need at least 2 data points for crossover detection
-            if index < 1:
+            if len(histogram_tail) < 2:
                 return False
             
-            yesterday = macd_histogram.iloc[index - 1]
-            today = macd_histogram.iloc[index]
+            yesterday = histogram_tail[-2]
+            today = histogram_tail[-1]
             
-            if pd.isna(yesterday) or pd.isna(today):
+            # NaN is the only value not equal to itself
+            if yesterday != yesterday or today != today:
                 return False
             
             # Golden cross: histogram crosses above zero
             return yesterday < 0 and today > 0
         
-        elif indicator.lower() == 'kdj':
-            k_val = kdj_k.iloc[index]
-            d_val = kdj_d.iloc[index]
-            
-            if pd.isna(k_val) or pd.isna(d_val):
+        elif indicator == 'kdj':
+            if k_val != k_val or d_val != d_val:
                 return False
             
             thresh = threshold if threshold is not None else self.kdj_buy_threshold
@@ -140,15 +272,16 @@ class SignalDetector:
     
     def _check_sell_signal(
         self,
-        index: int,
         indicator: str,
-        macd_histogram: pd.Series,
-        kdj_k: pd.Series,
-        kdj_d: pd.Series,
+        histogram_tail: Sequence[float],
+        k_val: float,
+        d_val: float,
         threshold: Optional[float]
     ) -> bool:
         """
-        Check if there's a sell signal at the given index.
+        Check if there's a sell signal on the last bar of histogram_tail.
+        
+        indicator must already be lowercase.
         
         MACD Sell (Peak Detection):
             - Day before yesterday < yesterday (was rising)
@@ -157,16 +290,16 @@ class SignalDetector:
         
         KDJ Sell: K and D both above threshold
         """
-        if indicator.lower() == 'macd':
+        if indicator == 'macd':
             # Need at least 3 data points for peak detection
-            if index < 2:
+            if len(histogram_tail) < 3:
                 return False
             
-            day_before_yesterday = macd_histogram.iloc[index - 2]
-            yesterday = macd_histogram.iloc[index - 1]
-            today = macd_histogram.iloc[index]
+            day_before_yesterday = histogram_tail[-3]
+            yesterday = histogram_tail[-2]
+            today = histogram_tail[-1]
             
-            if pd.isna(day_before_yesterday) or pd.isna(yesterday) or pd.isna(today):
+            if day_before_yesterday != day_before_yesterday or yesterday != yesterday or today != today:
                 return False
             
             # Peak detection: was rising, now declining, in positive territory
@@ -176,11 +309,8 @@ class SignalDetector:
             
             return was_rising and now_declining and in_positive_territory
         
-        elif indicator.lower() == 'kdj':
-            k_val = kdj_k.iloc[index]
-            d_val = kdj_d.iloc[index]
-            
-            if pd.isna(k_val) or pd.isna(d_val):
+        elif indicator == 'kdj':
+            if k_val != k_val or d_val != d_val:
                 return False
             
             thresh = threshold if threshold is not None else self.kdj_sell_threshold
@@ -212,38 +342,107 @@ class SignalDetector:
         if len(df) < 3:
             return SignalType.HOLD, "Insufficient data for signal detection", {}
         
-        # Calculate indicators
-        macd_result = self.technical_analysis.calculate_macd(df)
-        kdj_result = self.technical_analysis.calculate_kdj(df)
+        # Calculate indicators with the JIT-compiled array kernels
+        macd_histogram = self.technical_analysis.calculate_macd_histogram(
+            df['Close'].to_numpy(dtype=np.float64)
+        )
+        kdj = self.technical_analysis.calculate_kdj_arrays(df)
         
-        if "error" in macd_result or "error" in kdj_result:
+        if macd_histogram is None or kdj is None:
             return SignalType.HOLD, "Error calculating indicators", {}
         
-        macd_histogram = macd_result["histogram"]
-        kdj_k = kdj_result["k"]
-        kdj_d = kdj_result["d"]
+        kdj_k, kdj_d = kdj
+        return self._evaluate_current_signal(
+            macd_histogram, kdj_k, kdj_d,
+            buy_indicator.lower(), sell_indicator.lower(), buy_threshold, sell_threshold
+        )
+    
+    def get_current_signals_batch(
+        self,
+        frames: List[pd.DataFrame],
+        buy_indicator: str,
+        sell_indicator: str,
+        buy_threshold: Optional[float] = None,
+        sell_threshold: Optional[float] = None
+    ) -> List[Tuple[SignalType, str, dict]]:
+        """
+        Get current trading signals for several stocks in one pass.
+        
+        Indicators for all stocks are computed together on stacked price
+        matrices, then each stock's latest values are evaluated exactly as
+        in get_current_signal.
+        
+        Args:
+            frames: DataFrames of equal length with no missing High/Low/Close
+            buy_indicator: Indicator for buy signals
+            sell_indicator: Indicator for sell signals
+            buy_threshold: Custom KDJ buy threshold
+            sell_threshold: Custom KDJ sell threshold
+        
+        Returns:
+            List of (signal_type, reasoning, indicator_values), one per frame
+        """
+        if len(frames[0]) < 3:
+            return [(SignalType.HOLD, "Insufficient data for signal detection", {}) for _ in frames]
+        
+        closes = np.column_stack([df['Close'].to_numpy(dtype=np.float64) for df in frames])
+        highs = np.column_stack([df['High'].to_numpy(dtype=np.float64) for df in frames])
+        lows = np.column_stack([df['Low'].to_numpy(dtype=np.float64) for df in frames])
         
-        # Get last index
-        last_idx = len(df) - 1
+        macd_result = self.technical_analysis.calculate_macd_batch(closes)
+        kdj_result = self.technical_analysis.calculate_kdj_batch(highs, lows, closes)
+        
+        if "error" in macd_result or "error" in kdj_result:
+            return [(SignalType.HOLD, "Error calculating indicators", {}) for _ in frames]
+        
+        # Normalize once rather than per stock
+        buy_indicator = buy_indicator.lower()
+        sell_indicator = sell_indicator.lower()
+        
+        return [
+            self._evaluate_current_signal(
+                macd_result["histogram"][:, i],
+                kdj_result["k"][:, i],
+                kdj_result["d"][:, i],
+                buy_indicator, sell_indicator, buy_threshold, sell_threshold
+            )
+            for i in range(len(frames))
+        ]
+    
+    def _evaluate_current_signal(
+        self,
+        macd_histogram: np.ndarray,
+        kdj_k: np.ndarray,
+        kdj_d: np.ndarray,
+        buy_indicator: str,
+        sell_indicator: str,
+        buy_threshold: Optional[float],
+        sell_threshold: Optional[float]
+    ) -> Tuple[SignalType, str, dict]:
+        """
+        Evaluate the signal on the last bar of precomputed indicator arrays.
+        
+        Indicator names must already be lowercase.
+        """
+        # Signals look back at most two bars; read that tail once as Python floats
+        histogram = macd_histogram[-3:].tolist()
+        k_val = float(kdj_k[-1])
+        d_val = float(kdj_d[-1])
         
         # Check signals
-        is_buy = self._check_buy_signal(
-            last_idx, buy_indicator, macd_histogram, kdj_k, kdj_d, buy_threshold
-        )
-        is_sell = self._check_sell_signal(
-            last_idx, sell_indicator, macd_histogram, kdj_k, kdj_d, sell_threshold
-        )
+        is_buy = self._check_buy_signal(buy_indicator, histogram, k_val, d_val, buy_threshold)
+        is_sell = self._check_sell_signal(sell_indicator, histogram, k_val, d_val, sell_threshold)
         
         # Build indicator values for response
         indicator_values = {
-            "macd_histogram_today": round(float(macd_histogram.iloc[-1]), 4) if pd.notna(macd_histogram.iloc[-1]) else None,
-            "macd_histogram_yesterday": round(float(macd_histogram.iloc[-2]), 4) if pd.notna(macd_histogram.iloc[-2]) else None,
-            "kdj_k": round(float(kdj_k.iloc[-1]), 2) if pd.notna(kdj_k.iloc[-1]) else None,
-            "kdj_d": round(float(kdj_d.iloc[-1]), 2) if pd.notna(kdj_d.iloc[-1]) else None
+            "macd_histogram_today": _round_or_none(histogram[-1], 4),
+            "macd_histogram_yesterday": _round_or_none(histogram[-2], 4),
+            "kdj_k": _round_or_none(k_val, 2),
+            "kdj_d": _round_or_none(d_val, 2)
         }
         
-        if len(macd_histogram) >= 3:
-            indicator_values["macd_histogram_day_before"] = round(float(macd_histogram.iloc[-3]), 4) if pd.notna(macd_histogram.iloc[-3]) else None
+        if len(histogram) >= 3:
+            indicator_values["macd_histogram_day_before"] = _round_or_none(histogram[-3], 4)
         
         # Determine final signal and reasoning
         if is_buy and is_sell:
@@ -260,11 +459,11 @@ class SignalDetector:
     
     def _build_buy_reasoning(self, indicator: str, values: dict, threshold: Optional[float]) -> str:
         """Build reasoning string for BUY signal."""
-        if indicator.lower() == 'macd':
+        if indicator == 'macd':
             yesterday = values.get("macd_histogram_yesterday", "N/A")
             today = values.get("macd_histogram_today", "N/A")
             return f"MACD golden cross: histogram crossed above zero (yesterday: {yesterday}, today: {today})"
-        elif indicator.lower() == 'kdj':
+        elif indicator == 'kdj':
             k = values.get("kdj_k", "N/A")
             d = values.get("kdj_d", "N/A")
             thresh = threshold if threshold is not None else self.kdj_buy_threshold
@@ -273,12 +472,12 @@ class SignalDetector:
     
     def _build_sell_reasoning(self, indicator: str, values: dict, threshold: Optional[float]) -> str:
         """Build reasoning string for SELL signal."""
-        if indicator.lower() == 'macd':
+        if indicator == 'macd':
             day_before = values.get("macd_histogram_day_before", "N/A")
             yesterday = values.get("macd_histogram_yesterday", "N/A")
             today = values.get("macd_histogram_today", "N/A")
             return f"MACD peak detected: histogram peaked and declining (day before: {day_before}, yesterday: {yesterday}, today: {today})"
-        elif indicator.lower() == 'kdj':
+        elif indicator == 'kdj':
             k = values.get("kdj_k", "N/A")
             d = values.get("kdj_d", "N/A")
             thresh = threshold if threshold is not None else self.kdj_sell_threshold
@@ -289,12 +488,12 @@ class SignalDetector:
         """Build reasoning string for HOLD signal."""
         parts = []
         
-        if buy_ind.lower() == 'macd' or sell_ind.lower() == 'macd':
+        if buy_ind == 'macd' or sell_ind == 'macd':
             yesterday = values.get("macd_histogram_yesterday", "N/A")
             today = values.get("macd_histogram_today", "N/A")
             parts.append(f"MACD histogram: yesterday={yesterday}, today={today}")
         
-        if buy_ind.lower() == 'kdj' or sell_ind.lower() == 'kdj':
+        if buy_ind == 'kdj' or sell_ind == 'kdj':
             k = values.get("kdj_k", "N/A")
             d = values.get("kdj_d", "N/A")
             parts.append(f"KDJ: K={k}, D={d}")
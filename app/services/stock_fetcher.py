@@ -1,20 +1,73 @@
 """
 Stock Fetcher Service
 
-Fetches stock symbols from NASDAQ FTP server and categorizes by market cap.
+Fetches stock symbols from NASDAQ's symbol directory and categorizes by market cap.
 Uses a local JSON file as a cache to avoid repeated API calls.
 """
 
-import json
+import copy
 import os
+import threading
 import time
 import urllib.request
-from typing import Dict, List, Any, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Set, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
-import yfinance as yf
+import orjson
+from yfinance.data import YfData
 
 from app.core.config import settings
+from app.services.price_cache import yahoo_session
+
+
+# Transient Yahoo quote failures are retried with exponential backoff
+QUOTE_RETRIES = 2
+QUOTE_RETRY_DELAY = 0.3  # seconds, doubled on each retry
+
+# Symbols per /v7/finance/quote request when categorizing stocks
+QUOTE_BATCH_SIZE = 200
+
+# Format of the database's last_updated timestamps (local time)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Days before a category's market caps are re-checked; big companies rarely
+# change category, while micro caps churn quickly
+CATEGORY_TTL_DAYS = {
+    "mega_cap": 30,
+    "large_cap": 14,
+    "mid_cap": 7,
+    "small_cap": 7,
+    "micro_cap": 3
+}
+
+# Hours before a refresh that left parts of the database expired, e.g.
+# because NASDAQ or Yahoo was down, is tried again
+REFRESH_RETRY_HOURS = 1
+
+
+def _raw_value(value: Any) -> Any:
+    """Unwrap a Yahoo number, which may be {"raw": ..., "fmt": ...}."""
+    if isinstance(value, dict):
+        return value.get("raw")
+    return value
+
+
+def _symbols_by_category(stocks: Dict[str, List[Any]]) -> Dict[str, List[str]]:
+    """Flatten each category's stock entries to its list of symbols."""
+    return {
+        category: [s["symbol"] for s in entries if isinstance(s, dict) and "symbol" in s]
+        for category, entries in stocks.items()
+    }
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a failed request is worth retrying (throttling, server or network error)."""
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    if status_code is None:
+        return True
+    return status_code == 429 or status_code >= 500
 
 
 class StockFetcher:
@@ -29,12 +82,25 @@ class StockFetcher:
     - micro_cap: < $300M
     """
     
+    NASDAQ_HTTPS_URL = 'https://ftp.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt'
     NASDAQ_FTP_URL = 'ftp://ftp.nasdaqtrader.com/SymbolDirectory/nasdaqlisted.txt'
+    QUOTE_URL = 'https://query2.finance.yahoo.com/v7/finance/quote'
     STOCKS_CACHE_FILE = 'stocks_by_market_cap.json'
     
     def __init__(self):
         self.max_workers = settings.max_workers
-        self.timeout = 5
+        
+        # yfinance's client is a process-wide singleton; bind it to the shared
+        # session once so its cookie and crumb are fetched once and reused
+        self.yahoo = YfData(session=yahoo_session)
+        
+        # Database update in progress, shared by concurrent callers
+        self._update: Optional[Future] = None
+        self._update_lock = threading.Lock()
+        
+        # Parsed stocks database and the file mtime it was read at
+        self._loaded: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._loaded_lock = threading.Lock()
     
     def ensure_database_exists(self) -> bool:
         """
@@ -56,38 +122,47 @@ class StockFetcher:
     
     def fetch_nasdaq_symbols(self) -> List[str]:
         """
-        Fetch all NASDAQ listed stock symbols from FTP server.
+        Fetch all NASDAQ listed stock symbols.
+        
+        The listing is downloaded from NASDAQ's HTTPS mirror, which connects
+        faster than FTP; the FTP server is used if the mirror fails or
+        returns no stocks.
         
         Returns:
             List of stock symbols (excluding ETFs)
         """
-        try:
-            print("Fetching NASDAQ stocks from FTP server...")
-            
-            with urllib.request.urlopen(self.NASDAQ_FTP_URL, timeout=30) as response:
-                content = response.read().decode('utf-8')
-            
-            lines = content.strip().split('\n')
-            stocks = []
-            
+        for url in (self.NASDAQ_HTTPS_URL, self.NASDAQ_FTP_URL):
+            try:
+                print(f"Fetching NASDAQ stocks from {url}...")
+                stocks = self._read_nasdaq_listing(url)
+                if stocks:
+                    print(f"Found {len(stocks)} NASDAQ stocks")
+                    return stocks
+                print(f"No NASDAQ stocks found at {url}")
+            except Exception as e:
+                print(f"Error fetching NASDAQ stocks from {url}: {e}")
+        
+        return []
+    
+    def _read_nasdaq_listing(self, url: str) -> List[str]:
+        """Download a nasdaqlisted.txt file and return its non-ETF symbols."""
+        stocks = []
+        
+        # Parse the listing line by line as it streams in
+        with urllib.request.urlopen(url, timeout=30) as response:
             # Skip header line
-            for line in lines[1:]:
-                if line.strip():
-                    parts = line.split('|')
-                    if len(parts) >= 8:
-                        symbol = parts[0].strip()
-                        etf_flag = parts[6].strip()
-                        
-                        # Only include non-ETF stocks
-                        if etf_flag == 'N':
-                            stocks.append(symbol)
-            
-            print(f"Found {len(stocks)} NASDAQ stocks")
-            return stocks
-            
-        except Exception as e:
-            print(f"Error fetching NASDAQ stocks: {e}")
-            return []
+            response.readline()
+            for raw_line in response:
+                parts = raw_line.decode('utf-8').split('|', 8)
+                if len(parts) >= 8:
+                    symbol = parts[0].strip()
+                    etf_flag = parts[6].strip()
+                    
+                    # Only include non-ETF stocks
+                    if etf_flag == 'N':
+                        stocks.append(symbol)
+        
+        return stocks
     
     def get_market_cap_category(self, market_cap: float) -> str:
         """Categorize a stock by its market cap."""
@@ -102,37 +177,92 @@ class StockFetcher:
         else:
             return "micro_cap"
     
-    def check_market_cap(self, symbol: str) -> Optional[Dict[str, Any]]:
+    def _fetch_quote_batch(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
         """
-        Get market cap info for a single stock.
+        Fetch market cap info for many stocks with one /v7/finance/quote request.
+        
+        The quote endpoint takes a comma-separated symbol list, so a batch
+        costs one round trip instead of one per symbol. It has no sector or
+        industry, so entries carry only symbol, market cap, category and name.
+        
+        Args:
+            symbols: Up to QUOTE_BATCH_SIZE stock symbols
         
         Returns:
-            Dict with symbol, market_cap, category, etc. or None if error
+            Dict mapping symbol to its entry; symbols without a positive
+            market cap are left out
         """
-        try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            market_cap = info.get('marketCap', 0)
-            
-            if market_cap and market_cap > 0:
-                return {
+        data = self._get_yahoo_json(
+            self.QUOTE_URL,
+            {"symbols": ",".join(symbols), "fields": "marketCap,longName"}
+        )
+        
+        entries = {}
+        for quote in (data.get("quoteResponse") or {}).get("result") or []:
+            symbol = quote.get("symbol")
+            market_cap = _raw_value(quote.get("marketCap"))
+            if symbol and market_cap and market_cap > 0:
+                entries[symbol] = {
                     "symbol": symbol,
                     "market_cap": market_cap,
                     "category": self.get_market_cap_category(market_cap),
-                    "name": info.get('longName', symbol),
-                    "sector": info.get('sector', 'N/A'),
-                    "industry": info.get('industry', 'N/A')
+                    "name": quote.get('longName') or symbol
                 }
-            return None
+        return entries
+    
+    def _get_yahoo_json(self, url: str, params: Dict[str, str]) -> Dict[str, Any]:
+        """
+        GET a Yahoo endpoint through yfinance's client, which supplies the
+        cookie and crumb. Throttled, server and network errors are retried
+        QUOTE_RETRIES times.
+        """
+        for attempt in range(QUOTE_RETRIES + 1):
+            try:
+                return self.yahoo.get_raw_json(url, params=params)
+            except Exception as e:
+                if attempt == QUOTE_RETRIES or not _is_transient(e):
+                    raise
+                time.sleep(QUOTE_RETRY_DELAY * 2 ** attempt)
+    
+    def _lookup_market_caps(self, symbols: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+        """
+        Look up market caps QUOTE_BATCH_SIZE symbols at a time, one quote
+        request per batch, with batches fetched concurrently.
+        
+        Returns:
+            Tuple of (entries by symbol for stocks with a positive market
+            cap, symbols whose request failed)
+        """
+        found = {}
+        failed = set()
+        
+        batches = [
+            symbols[start:start + QUOTE_BATCH_SIZE]
+            for start in range(0, len(symbols), QUOTE_BATCH_SIZE)
+        ]
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_quote_batch, batch): batch
+                for batch in batches
+            }
             
-        except Exception as e:
-            print(f"Error checking {symbol}: {e}")
-            return None
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    found.update(future.result())
+                except Exception as e:
+                    print(f"Error processing {len(batch)} stocks from {batch[0]}: {e}")
+                    failed.update(batch)
+        
+        return found, failed
     
     def categorize_stocks(self, symbols: List[str]) -> Dict[str, Any]:
         """
         Categorize a list of stocks by market cap using concurrent requests.
         
+        See _lookup_market_caps for how the lookups are batched.
+        
         Args:
             symbols: List of stock symbols to categorize
         
@@ -153,26 +283,15 @@ class StockFetcher:
         successful = 0
         failed = 0
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {
-                executor.submit(self.check_market_cap, symbol): symbol
-                for symbol in symbols
-            }
-            
-            for future in as_completed(futures):
-                symbol = futures[future]
-                try:
-                    result = future.result(timeout=self.timeout)
-                    if result:
-                        categorized[result["category"]].append(result)
-                        successful += 1
-                    else:
-                        categorized["uncategorized"].append({"symbol": symbol})
-                        failed += 1
-                except Exception as e:
-                    print(f"Error processing {symbol}: {e}")
-                    categorized["uncategorized"].append({"symbol": symbol})
-                    failed += 1
+        results, _ = self._lookup_market_caps(symbols)
+        for symbol in symbols:
+            result = results.get(symbol)
+            if result:
+                categorized[result["category"]].append(result)
+                successful += 1
+            else:
+                categorized["uncategorized"].append({"symbol": symbol})
+                failed += 1
         
         summary = {
             "total_stocks": len(symbols),
@@ -184,14 +303,15 @@ class StockFetcher:
         return {
             "summary": summary,
             "stocks": categorized,
-            "last_updated": time.strftime("%Y-%m-%d %H:%M:%S")
+            "symbols_by_category": _symbols_by_category(categorized),
+            "last_updated": time.strftime(TIMESTAMP_FORMAT)
         }
     
     def save_to_json(self, data: Dict[str, Any]) -> bool:
         """Save categorized stocks to JSON cache file."""
         try:
-            with open(self.STOCKS_CACHE_FILE, 'w') as f:
-                json.dump(data, f, indent=2)
+            with open(self.STOCKS_CACHE_FILE, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
             print(f"Stocks saved to {self.STOCKS_CACHE_FILE}")
             return True
         except Exception as e:
@@ -199,18 +319,33 @@ class StockFetcher:
             return False
     
     def load_from_json(self) -> Optional[Dict[str, Any]]:
-        """Load categorized stocks from JSON cache file."""
+        """
+        Load categorized stocks from JSON cache file.
+        
+        The parsed data is kept in memory and returned again until the
+        file's modification time changes, so it is shared between callers
+        and must not be mutated.
+        """
         try:
             if os.path.exists(self.STOCKS_CACHE_FILE):
-                with open(self.STOCKS_CACHE_FILE, 'r') as f:
-                    data = json.load(f)
-                
-                if self._validate_data(data):
-                    print(f"Stocks loaded from {self.STOCKS_CACHE_FILE}")
-                    return data
-                else:
-                    print(f"Invalid data in {self.STOCKS_CACHE_FILE}")
-                    return None
+                mtime = os.stat(self.STOCKS_CACHE_FILE).st_mtime_ns
+                with self._loaded_lock:
+                    if self._loaded is not None and self._loaded[0] == mtime:
+                        return self._loaded[1]
+                    
+                    with open(self.STOCKS_CACHE_FILE, 'rb') as f:
+                        data = orjson.loads(f.read())
+                    
+                    if self._validate_data(data):
+                        # Files written before symbols were precomputed lack them
+                        if "symbols_by_category" not in data:
+                            data["symbols_by_category"] = _symbols_by_category(data["stocks"])
+                        print(f"Stocks loaded from {self.STOCKS_CACHE_FILE}")
+                        self._loaded = (mtime, data)
+                        return data
+                    else:
+                        print(f"Invalid data in {self.STOCKS_CACHE_FILE}")
+                        return None
             return None
         except Exception as e:
             print(f"Error loading stocks from JSON: {e}")
@@ -229,9 +364,152 @@ class StockFetcher:
         
         return all(cat in stocks for cat in required_categories)
     
+    def _is_expired(self, timestamp: Optional[str], ttl_days: float) -> bool:
+        """Whether a last_updated timestamp is older than ttl_days (missing counts as expired)."""
+        try:
+            updated = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+        except (TypeError, ValueError):
+            return True
+        return datetime.now() - updated > timedelta(days=ttl_days)
+    
+    def _stale_categories(self, data: Dict[str, Any]) -> List[str]:
+        """Categories whose market caps are older than their TTL."""
+        updated = data.get("category_updated", {})
+        return [
+            category for category, ttl_days in CATEGORY_TTL_DAYS.items()
+            if self._is_expired(updated.get(category, data.get("last_updated")), ttl_days)
+        ]
+    
+    def _listing_expired(self, data: Dict[str, Any]) -> bool:
+        """Whether the NASDAQ symbol listing is older than stocks_cache_ttl_days."""
+        return self._is_expired(
+            data.get("listing_updated", data.get("last_updated")),
+            settings.stocks_cache_ttl_days
+        )
+    
+    def is_stale(self, data: Dict[str, Any]) -> bool:
+        """
+        Check whether any part of the stocks database needs refreshing.
+        
+        Always False when stocks_cache_ttl_days is 0 or less, which turns
+        automatic refreshes off, and for REFRESH_RETRY_HOURS after a
+        refresh attempt, so parts it failed to update are not retried on
+        every call.
+        """
+        if settings.stocks_cache_ttl_days <= 0:
+            return False
+        if not self._is_expired(data.get("refresh_attempted"), REFRESH_RETRY_HOURS / 24):
+            return False
+        return self._listing_expired(data) or bool(self._stale_categories(data))
+    
+    def refresh_stale(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Refresh only the expired parts of the stocks database.
+        
+        Stocks in categories past their CATEGORY_TTL_DAYS are re-checked and
+        moved to their current category. When the NASDAQ listing is older
+        than stocks_cache_ttl_days it is fetched again: delisted stocks are
+        dropped, and new and uncategorized ones are checked. A stock whose
+        re-check fails keeps its previous entry, and a category or the
+        listing is only marked updated once all of its lookups succeeded;
+        the rest are retried after REFRESH_RETRY_HOURS.
+        
+        Args:
+            data: Stocks data as returned by load_from_json
+        
+        Returns:
+            Refreshed stocks data, also saved to the JSON cache file
+        """
+        # The loaded data is shared through load_from_json; update a copy
+        data = copy.deepcopy(data)
+        now = time.strftime(TIMESTAMP_FORMAT)
+        stocks = data["stocks"]
+        stocks.setdefault("uncategorized", [])
+        stale = self._stale_categories(data)
+        listing_expired = self._listing_expired(data)
+        
+        # Pin the timestamps databases without them fall back to, since
+        # last_updated is rewritten below even if lookups fail
+        updated = data.setdefault("category_updated", {})
+        for category in CATEGORY_TTL_DAYS:
+            updated.setdefault(category, data.get("last_updated"))
+        data.setdefault("listing_updated", data.get("last_updated"))
+        
+        previous = {
+            entry["symbol"]: (category, entry)
+            for category in stale
+            for entry in stocks[category]
+            if isinstance(entry, dict) and "symbol" in entry
+        }
+        to_check = list(previous)
+        
+        listing_refreshed = False
+        if listing_expired:
+            symbols = self.fetch_nasdaq_symbols()
+            if symbols:
+                listed = set(symbols)
+                known = set()
+                for category, entries in stocks.items():
+                    stocks[category] = [
+                        entry for entry in entries
+                        if isinstance(entry, dict) and entry.get("symbol") in listed
+                    ]
+                    known.update(entry["symbol"] for entry in stocks[category])
+                
+                previous = {symbol: old for symbol, old in previous.items() if symbol in listed}
+                to_check = list(previous)
+                to_check.extend(entry["symbol"] for entry in stocks["uncategorized"])
+                to_check.extend(symbol for symbol in symbols if symbol not in known)
+                listing_refreshed = True
+        
+        print(f"Refreshing stocks database: {len(stale)} stale categories, {len(to_check)} stocks to check")
+        
+        failed = set()
+        if to_check:
+            found, failed = self._lookup_market_caps(to_check)
+            
+            # Re-file every checked stock under its current category
+            checking = set(to_check)
+            for category, entries in stocks.items():
+                stocks[category] = [entry for entry in entries if entry.get("symbol") not in checking]
+            for symbol in dict.fromkeys(to_check):
+                entry = found.get(symbol)
+                if entry:
+                    stocks[entry["category"]].append(entry)
+                else:
+                    category, entry = previous.get(symbol) or ("uncategorized", {"symbol": symbol})
+                    stocks[category].append(entry)
+        
+        unchecked = {previous[symbol][0] for symbol in failed if symbol in previous}
+        for category in stale:
+            if category not in unchecked:
+                updated[category] = now
+        if listing_refreshed and not failed.difference(previous):
+            data["listing_updated"] = now
+        data["refresh_attempted"] = now
+        
+        uncategorized = len(stocks["uncategorized"])
+        total = sum(len(entries) for entries in stocks.values())
+        data["summary"] = {
+            "total_stocks": total,
+            "successful_checks": total - uncategorized,
+            "failed_checks": uncategorized,
+            "categories": {category: len(entries) for category, entries in stocks.items()}
+        }
+        data["symbols_by_category"] = _symbols_by_category(stocks)
+        data["last_updated"] = now
+        
+        self.save_to_json(data)
+        return data
+    
     def update_stocks_database(self, force_update: bool = False) -> Dict[str, Any]:
         """
-        Update the stocks database from NASDAQ FTP.
+        Update the stocks database from the NASDAQ listing.
+        
+        Without force_update, an existing database is reused and only its
+        expired parts are refreshed (see refresh_stale). Concurrent calls,
+        e.g. from overlapping scans that all find the database stale, share
+        a single update instead of each re-checking thousands of stocks.
         
         Args:
             force_update: If True, always fetch fresh data
@@ -239,9 +517,53 @@ class StockFetcher:
         Returns:
             Updated stocks data
         """
+        with self._update_lock:
+            future = self._update
+            owner = future is None
+            if owner:
+                future = self._update = Future()
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            data = self._update_stocks_database(force_update)
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._update_lock:
+                self._update = None
+    
+    def refresh_in_background(self):
+        """
+        Bring the stocks database up to date on a daemon thread.
+        
+        Lets callers keep serving a stale database instead of waiting on a
+        refresh that re-checks thousands of stocks. Does nothing while an
+        update is already running.
+        """
+        with self._update_lock:
+            if self._update is not None:
+                return
+        threading.Thread(target=self._refresh_database, name="stocks-refresh", daemon=True).start()
+    
+    def _refresh_database(self):
+        """Background thread target for refresh_in_background."""
+        try:
+            self.update_stocks_database(force_update=False)
+        except Exception as e:
+            print(f"Error refreshing stocks database: {e}")
+    
+    def _update_stocks_database(self, force_update: bool) -> Dict[str, Any]:
+        """Update the stocks database; see update_stocks_database."""
         if not force_update:
             existing = self.load_from_json()
             if existing:
+                if self.is_stale(existing):
+                    return self.refresh_stale(existing)
                 print("Using existing stocks database")
                 return existing
         
@@ -254,6 +576,8 @@ class StockFetcher:
             return {"error": "No stocks available"}
         
         categorized = self.categorize_stocks(symbols)
+        categorized["listing_updated"] = categorized["last_updated"]
+        categorized["category_updated"] = dict.fromkeys(CATEGORY_TTL_DAYS, categorized["last_updated"])
         self.save_to_json(categorized)
         
         return categorized
@@ -270,28 +594,31 @@ class StockFetcher:
         """
         data = self.load_from_json()
         if not data:
-            print(f"No stocks database found. Updating for category: {category}")
+            print(f"Stocks database missing. Updating for category: {category}")
             data = self.update_stocks_database(force_update=False)
             if "error" in data:
                 return []
+        elif self.is_stale(data):
+            # Serve the current lists while the stale parts refresh
+            self.refresh_in_background()
         
-        stocks = data.get("stocks", {}).get(category, [])
-        return [s["symbol"] for s in stocks if isinstance(s, dict) and "symbol" in s]
+        return list(data["symbols_by_category"].get(category, []))
     
     def get_all_stocks(self) -> List[str]:
         """Get all stock symbols from all categories."""
         data = self.load_from_json()
         if not data:
-            print("No stocks database found. Updating for all stocks")
+            print("Stocks database missing. Updating for all stocks")
             data = self.update_stocks_database(force_update=False)
             if "error" in data:
                 return []
+        elif self.is_stale(data):
+            # Serve the current lists while the stale parts refresh
+            self.refresh_in_background()
         
         all_symbols = []
         for category in ["mega_cap", "large_cap", "mid_cap", "small_cap", "micro_cap"]:
-            stocks = data.get("stocks", {}).get(category, [])
-            symbols = [s["symbol"] for s in stocks if isinstance(s, dict) and "symbol" in s]
-            all_symbols.extend(symbols)
+            all_symbols.extend(data["symbols_by_category"].get(category, []))
         
         return all_symbols
     
@@ -6,10 +6,204 @@ This ensures consistency between what users see in their trading app
 and what this API calculates.
 """
 
+import threading
+
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import Dict, Any, Optional, Tuple
 
+from app.services._njit import njit, prange
+
+
+# Numba's workqueue threading layer cannot run parallel kernels from several
+# threads at once, so concurrent requests take turns on the batch kernels
+_parallel_lock = threading.Lock()
+
+
+def _latest(values: pd.Series, digits: int) -> Optional[float]:
+    """Round the last value of a series for output, mapping NaN to None."""
+    value = float(values.to_numpy()[-1])
+    return round(value, digits) if value == value else None
+
+
+@njit(cache=True)
+def _ewm_step(weighted: float, old_wt: float, cur: float, old_wt_factor: float) -> Tuple[float, float]:
+    """
+    One step of pandas' ewm mean recurrence (adjust=True, NaNs kept in
+    place), returning the updated (weighted, old_wt).
+    """
+    if weighted == weighted:
+        old_wt *= old_wt_factor
+        if cur == cur:
+            if weighted != cur:
+                weighted = (old_wt * weighted + cur) / (old_wt + 1.0)
+            old_wt += 1.0
+    elif cur == cur:
+        weighted = cur
+    return weighted, old_wt
+
+
+@njit(cache=True)
+def _ewm_mean_1d(values: np.ndarray, span: int) -> np.ndarray:
+    """
+    JIT-compiled exponentially weighted mean of a 1-D array.
+    
+    Matches pandas' ``ewm(span=span).mean()`` (adjust=True, NaNs kept in
+    place) step for step.
+    """
+    old_wt_factor = 1.0 - 2.0 / (span + 1.0)
+    
+    output = np.empty_like(values)
+    weighted = values[0]
+    old_wt = 1.0
+    output[0] = weighted
+    
+    for i in range(1, values.shape[0]):
+        weighted, old_wt = _ewm_step(weighted, old_wt, values[i], old_wt_factor)
+        output[i] = weighted
+    
+    return output
+
+
+@njit(cache=True)
+def _macd_loop(
+    close: np.ndarray,
+    fast_period: int,
+    slow_period: int,
+    signal_period: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    JIT-compiled MACD and signal lines in one pass over the closes.
+    
+    Advances the fast, slow and signal EMAs together with _ewm_step, the
+    recurrence behind _ewm_mean_1d, so the values match pandas' ewm exactly.
+    """
+    fast_factor = 1.0 - 2.0 / (fast_period + 1.0)
+    slow_factor = 1.0 - 2.0 / (slow_period + 1.0)
+    signal_factor = 1.0 - 2.0 / (signal_period + 1.0)
+    
+    macd_line = np.empty_like(close)
+    signal_line = np.empty_like(close)
+    fast = close[0]
+    slow = close[0]
+    fast_wt = 1.0
+    slow_wt = 1.0
+    signal_wt = 1.0
+    macd_line[0] = fast - slow
+    signal = macd_line[0]
+    signal_line[0] = signal
+    
+    for i in range(1, close.shape[0]):
+        fast, fast_wt = _ewm_step(fast, fast_wt, close[i], fast_factor)
+        slow, slow_wt = _ewm_step(slow, slow_wt, close[i], slow_factor)
+        macd = fast - slow
+        signal, signal_wt = _ewm_step(signal, signal_wt, macd, signal_factor)
+        macd_line[i] = macd
+        signal_line[i] = signal
+    
+    return macd_line, signal_line
+
+
+@njit(cache=True)
+def _macd_hist_loop(close: np.ndarray, fast_period: int, slow_period: int, signal_period: int) -> np.ndarray:
+    """JIT-compiled MACD histogram (MACD line minus signal line)."""
+    macd_line, signal_line = _macd_loop(close, fast_period, slow_period, signal_period)
+    return macd_line - signal_line
+
+
+@njit(cache=True)
+def _rsv_loop(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    k_period: int
+) -> Tuple[np.ndarray, int]:
+    """
+    JIT-compiled RSV with rolling min/max over the last k_period bars.
+    
+    Windows are partial for the first k_period - 1 bars and skip NaN, as
+    pandas' ``rolling(min_periods=1)`` does. A zero range divides by 1.
+    
+    Returns:
+        RSV array and the index of its first non-NaN value (-1 if none)
+    """
+    n = close.shape[0]
+    rsv = np.empty(n)
+    start = -1
+    for i in range(n):
+        low_min = np.nan
+        high_max = np.nan
+        for j in range(max(0, i - k_period + 1), i + 1):
+            if low[j] == low[j] and not low_min <= low[j]:
+                low_min = low[j]
+            if high[j] == high[j] and not high_max >= high[j]:
+                high_max = high[j]
+        
+        denominator = high_max - low_min
+        if denominator == 0:
+            denominator = 1.0
+        rsv[i] = ((close[i] - low_min) / denominator) * 100
+        if start < 0 and rsv[i] == rsv[i]:
+            start = i
+    
+    return rsv, start
+
+
+@njit(cache=True)
+def _kdj_loop(rsv: np.ndarray, start: int, k0: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    JIT-compiled Webull KDJ smoothing (2/3 previous + 1/3 current).
+    
+    K and D start at k0 on index start and stay 0 before it.
+    """
+    k_values = np.zeros_like(rsv)
+    d_values = np.zeros_like(rsv)
+    if start < 0:
+        return k_values, d_values
+    
+    k_values[start] = k0
+    d_values[start] = k0
+    for i in range(start + 1, rsv.shape[0]):
+        k_values[i] = 2/3 * k_values[i-1] + 1/3 * rsv[i]
+        d_values[i] = 2/3 * d_values[i-1] + 1/3 * k_values[i]
+    
+    return k_values, d_values
+
+
+@njit(cache=True, parallel=True)
+def _macd_batch_loop(
+    closes: np.ndarray,
+    fast_period: int,
+    slow_period: int,
+    signal_period: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    JIT-compiled MACD and signal lines for an (N, T) matrix, one row per stock.
+    
+    Rows are independent, so they are spread across cores with prange.
+    """
+    macd_line = np.empty_like(closes)
+    signal_line = np.empty_like(closes)
+    for row in prange(closes.shape[0]):
+        close = closes[row]
+        macd = _ewm_mean_1d(close, fast_period) - _ewm_mean_1d(close, slow_period)
+        macd_line[row] = macd
+        signal_line[row] = _ewm_mean_1d(macd, signal_period)
+    return macd_line, signal_line
+
+
+@njit(cache=True, parallel=True)
+def _kdj_batch_loop(rsv: np.ndarray, k0: float) -> Tuple[np.ndarray, np.ndarray]:
+    """JIT-compiled KDJ smoothing for an (N, T) RSV matrix, one row per stock."""
+    k_values = np.empty_like(rsv)
+    d_values = np.empty_like(rsv)
+    for row in prange(rsv.shape[0]):
+        k, d = _kdj_loop(rsv[row], 0, k0)
+        k_values[row] = k
+        d_values[row] = d
+    return k_values, d_values
+
 
 class TechnicalAnalysis:
     """
@@ -44,18 +238,17 @@ class TechnicalAnalysis:
         if df.empty or len(df) < slow_period:
             return {"error": "Insufficient data for MACD calculation"}
         
-        # Calculate EMAs using pandas ewm (matches Webull's calculation)
-        ema_fast = df['Close'].ewm(span=fast_period).mean()
-        ema_slow = df['Close'].ewm(span=slow_period).mean()
-        
-        # MACD line
-        macd_line = ema_fast - ema_slow
-        
-        # Signal line (EMA of MACD)
-        signal_line = macd_line.ewm(span=signal_period).mean()
+        # EMAs follow pandas ewm (matches Webull's calculation), computed
+        # in one fused pass by a JIT-compiled kernel
+        macd_values, signal_values = _macd_loop(
+            df['Close'].to_numpy(dtype=np.float64),
+            fast_period, slow_period, signal_period
+        )
         
         # Histogram (MACD - Signal)
-        histogram = macd_line - signal_line
+        macd_line = pd.Series(macd_values, index=df.index)
+        signal_line = pd.Series(signal_values, index=df.index)
+        histogram = pd.Series(macd_values - signal_values, index=df.index)
         
         return {
             "indicator": "MACD",
@@ -66,9 +259,9 @@ class TechnicalAnalysis:
             "signal_line": signal_line,
             "histogram": histogram,
             "latest": {
-                "macd": round(float(macd_line.iloc[-1]), 4) if pd.notna(macd_line.iloc[-1]) else None,
-                "signal": round(float(signal_line.iloc[-1]), 4) if pd.notna(signal_line.iloc[-1]) else None,
-                "histogram": round(float(histogram.iloc[-1]), 4) if pd.notna(histogram.iloc[-1]) else None
+                "macd": _latest(macd_line, 4),
+                "signal": _latest(signal_line, 4),
+                "histogram": _latest(histogram, 4)
             }
         }
     
@@ -99,30 +292,11 @@ class TechnicalAnalysis:
         if df.empty or len(df) < k_period:
             return {"error": "Insufficient data for KDJ calculation"}
         
-        # Calculate RSV (Raw Stochastic Value)
-        low_min = df['Low'].rolling(window=k_period, min_periods=1).min()
-        high_max = df['High'].rolling(window=k_period, min_periods=1).max()
-        
-        # Avoid division by zero
-        denominator = high_max - low_min
-        denominator = denominator.replace(0, 1)
-        
-        rsv = ((df['Close'] - low_min) / denominator) * 100
-        
-        # Initialize K and D series
-        k_values = pd.Series(0.0, index=rsv.index)
-        d_values = pd.Series(0.0, index=rsv.index)
-        
-        # Set initial K and D to 50 (Webull convention)
-        first_valid = rsv.first_valid_index()
-        if first_valid is not None:
-            k_values[first_valid] = 50
-            d_values[first_valid] = 50
-            
-            # Calculate K and D with Webull smoothing (2/3 previous + 1/3 current)
-            for i in range(rsv.index.get_loc(first_valid) + 1, len(rsv)):
-                k_values.iloc[i] = 2/3 * k_values.iloc[i-1] + 1/3 * rsv.iloc[i]
-                d_values.iloc[i] = 2/3 * d_values.iloc[i-1] + 1/3 * k_values.iloc[i]
+        # RSV and the Webull smoothing (2/3 previous + 1/3 current) run as
+        # a JIT-compiled kernel; only the results are wrapped in Series
+        k_array, d_array = self.calculate_kdj_arrays(df, k_period)
+        k_values = pd.Series(k_array, index=df.index)
+        d_values = pd.Series(d_array, index=df.index)
         
         # Calculate J
         j_values = 3 * k_values - 2 * d_values
@@ -136,12 +310,166 @@ class TechnicalAnalysis:
             "d": d_values,
             "j": j_values,
             "latest": {
-                "k": round(float(k_values.iloc[-1]), 2) if pd.notna(k_values.iloc[-1]) else None,
-                "d": round(float(d_values.iloc[-1]), 2) if pd.notna(d_values.iloc[-1]) else None,
-                "j": round(float(j_values.iloc[-1]), 2) if pd.notna(j_values.iloc[-1]) else None
+                "k": _latest(k_values, 2),
+                "d": _latest(d_values, 2),
+                "j": _latest(j_values, 2)
             }
         }
     
+    def calculate_macd_batch(
+        self,
+        closes: np.ndarray,
+        fast_period: int = 12,
+        slow_period: int = 26,
+        signal_period: int = 9
+    ) -> Dict[str, Any]:
+        """
+        Calculate MACD for many stocks at once.
+        
+        Same formulas as calculate_macd, applied to a (T, N) matrix holding
+        one column of closing prices per stock. All columns must cover the
+        same number of bars. Stocks are laid out as contiguous rows and
+        computed in parallel by a JIT-compiled kernel.
+        
+        Args:
+            closes: Closing prices, shape (T, N)
+            fast_period: Fast EMA period (default: 12)
+            slow_period: Slow EMA period (default: 26)
+            signal_period: Signal line period (default: 9)
+        
+        Returns:
+            Dictionary with (T, N) arrays, or error if insufficient data
+        """
+        if closes.size == 0 or len(closes) < slow_period:
+            return {"error": "Insufficient data for MACD calculation"}
+        
+        with _parallel_lock:
+            macd_rows, signal_rows = _macd_batch_loop(
+                np.ascontiguousarray(closes.T, dtype=np.float64),
+                fast_period, slow_period, signal_period
+            )
+        macd_line = macd_rows.T
+        signal_line = signal_rows.T
+        
+        return {
+            "indicator": "MACD",
+            "fast_period": fast_period,
+            "slow_period": slow_period,
+            "signal_period": signal_period,
+            "macd_line": macd_line,
+            "signal_line": signal_line,
+            "histogram": macd_line - signal_line
+        }
+    
+    def calculate_kdj_batch(
+        self,
+        highs: np.ndarray,
+        lows: np.ndarray,
+        closes: np.ndarray,
+        k_period: int = 9
+    ) -> Dict[str, Any]:
+        """
+        Calculate KDJ for many stocks at once.
+        
+        Same Webull-style smoothing as calculate_kdj, applied to (T, N)
+        matrices with one column per stock. Prices must not contain NaN.
+        
+        Args:
+            highs: High prices, shape (T, N)
+            lows: Low prices, shape (T, N)
+            closes: Closing prices, shape (T, N)
+            k_period: Period for RSV calculation (default: 9)
+        
+        Returns:
+            Dictionary with (T, N) K, D, J arrays, or error if insufficient data
+        """
+        if closes.size == 0 or len(closes) < k_period:
+            return {"error": "Insufficient data for KDJ calculation"}
+        
+        # Rolling min/max with a partial window for the first k_period - 1 bars
+        n_cols = closes.shape[1]
+        low_min = sliding_window_view(
+            np.vstack([np.full((k_period - 1, n_cols), np.inf), lows]), k_period, axis=0
+        ).min(axis=-1)
+        high_max = sliding_window_view(
+            np.vstack([np.full((k_period - 1, n_cols), -np.inf), highs]), k_period, axis=0
+        ).max(axis=-1)
+        
+        denominator = high_max - low_min
+        denominator = np.where(denominator == 0, 1.0, denominator)
+        rsv = ((closes - low_min) / denominator) * 100
+        
+        # Smooth each stock's row in parallel; prices have no NaN, so every
+        # stock starts at the first bar
+        with _parallel_lock:
+            k_rows, d_rows = _kdj_batch_loop(np.ascontiguousarray(rsv.T), 50.0)
+        k_values = k_rows.T
+        d_values = d_rows.T
+        
+        return {
+            "indicator": "KDJ",
+            "k_period": k_period,
+            "k": k_values,
+            "d": d_values,
+            "j": 3 * k_values - 2 * d_values
+        }
+    
+    def calculate_macd_histogram(
+        self,
+        close: np.ndarray,
+        fast_period: int = 12,
+        slow_period: int = 26,
+        signal_period: int = 9
+    ) -> Optional[np.ndarray]:
+        """
+        Calculate the MACD histogram as a plain array.
+        
+        Same values as calculate_macd's histogram, computed by a JIT-compiled
+        kernel without building intermediate pandas objects.
+        
+        Args:
+            close: Closing prices as float64 array
+            fast_period: Fast EMA period (default: 12)
+            slow_period: Slow EMA period (default: 26)
+            signal_period: Signal line period (default: 9)
+        
+        Returns:
+            Histogram array, or None if insufficient data
+        """
+        if len(close) < slow_period:
+            return None
+        return _macd_hist_loop(close, fast_period, slow_period, signal_period)
+    
+    def calculate_kdj_arrays(
+        self,
+        df: pd.DataFrame,
+        k_period: int = 9
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Calculate KDJ K and D as plain arrays.
+        
+        Same values as calculate_kdj, with RSV and the smoothing recurrence
+        run by JIT-compiled kernels.
+        
+        Args:
+            df: DataFrame with OHLCV data (must have High, Low, Close columns)
+            k_period: Period for RSV calculation (default: 9)
+        
+        Returns:
+            Tuple of (K, D) arrays, or None if insufficient data
+        """
+        if df.empty or len(df) < k_period:
+            return None
+        
+        rsv, start = _rsv_loop(
+            df['High'].to_numpy(dtype=np.float64),
+            df['Low'].to_numpy(dtype=np.float64),
+            df['Close'].to_numpy(dtype=np.float64),
+            k_period
+        )
+        
+        return _kdj_loop(rsv, start, 50.0)
+    
     def calculate_all(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
         Calculate both MACD and KDJ indicators.
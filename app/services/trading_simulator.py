@@ -5,14 +5,87 @@ Simulates paper trading based on buy/sell signals.
 Executes trades at next day's open price after signal is generated.
 """
 
+import numpy as np
 import pandas as pd
 from typing import Dict, Any, List, Tuple, Optional
 from datetime import datetime
 
+from app.services._njit import njit
 from app.services.signal_detector import SignalDetector
 from app.core.config import settings
 
 
+# One executed trade, as written by _simulate_kernel
+_TRADE_DTYPE = np.dtype([
+    ("fill", np.int64),          # bar the order filled on
+    ("price", np.float64),       # execution price
+    ("shares", np.float64),
+    ("commission", np.float64),
+    ("balance", np.float64)      # cash after the trade
+])
+
+
+@njit(cache=True)
+def _simulate_kernel(
+    open_prices: np.ndarray,
+    buy_signals: np.ndarray,
+    sell_signals: np.ndarray,
+    balance: float,
+    commission_rate: float,
+    trades: np.ndarray
+) -> int:
+    """
+    JIT-compiled trade execution over per-bar signal arrays.
+    
+    An order placed on a signal bar fills at the next bar's open, and
+    signals on the fill bar are ignored. Trades alternate BUY, SELL,
+    starting with a BUY, and are written in order to the preallocated
+    _TRADE_DTYPE array trades.
+    
+    Returns:
+        The number of trades written. A position still open at the end is
+        left for the caller to close.
+    """
+    n = open_prices.shape[0]
+    count = 0
+    shares = 0.0
+    # Signal bit that trades next: 1 (buy) while flat, 2 (sell) while holding
+    wanted = 1
+    i = 0
+    # Scan every bar: compiled, the per-bar check is as cheap as building
+    # an index of the signal bars would be, so walking only those is no faster
+    # A signal on the last bar has no next day to execute on
+    while i < n - 1:
+        if (buy_signals[i] | (sell_signals[i] << 1)) & wanted == 0:
+            i += 1
+            continue
+        
+        price = open_prices[i + 1]
+        if wanted == 1:
+            commission = balance * commission_rate
+            shares = (balance - commission) / price
+            balance_after = balance - commission
+        else:
+            sell_value = shares * price
+            commission = sell_value * commission_rate
+            balance = sell_value - commission
+            balance_after = balance
+        wanted ^= 3
+        
+        trade = trades[count]
+        trade["fill"] = i + 1
+        trade["price"] = price
+        trade["shares"] = shares
+        trade["commission"] = commission
+        trade["balance"] = balance_after
+        count += 1
+        
+        # Skip the fill bar
+        i += 2
+    
+    return count
+
+
 class TradingSimulator:
     """
     Paper trading simulator that executes trades based on technical signals.
@@ -83,129 +156,122 @@ class TradingSimulator:
     def _execute_trades(
         self,
         df: pd.DataFrame,
-        buy_signals: List[int],
-        sell_signals: List[int]
+        buy_signals: np.ndarray,
+        sell_signals: np.ndarray
     ) -> Tuple[List[Dict[str, Any]], float]:
         """
         Execute trades based on signals.
         
         Uses next day's open price for execution to simulate realistic trading.
+        The bar-by-bar loop runs in a JIT-compiled kernel over plain arrays
+        and records trades in a structured array. They are then processed
+        column by column - profit/loss and rounding are computed for all
+        trades at once - and only the final dicts are built per trade.
         """
-        trades = []
-        balance = self.initial_balance
-        shares = 0.0
-        position_open = False
-        buy_price = 0.0
-        buy_date = None
-        pending_buy = False
-        pending_sell = False
-        signal_date = None
+        open_prices = df['Open'].to_numpy(dtype=np.float64)
+        close_prices = df['Close'].to_numpy(dtype=np.float64)
         
-        for i in range(len(df)):
-            current_date = df.index[i]
-            
-            # Check for buy signal on current day's close
-            if buy_signals[i] == 1 and not position_open and not pending_buy:
-                pending_buy = True
-                signal_date = current_date
-                continue
-            
-            # Check for sell signal on current day's close
-            if sell_signals[i] == 1 and position_open and not pending_sell:
-                pending_sell = True
-                signal_date = current_date
-                continue
+        # At most one trade per bar, plus room to close at the end of period
+        trades = np.empty(len(df) + 1, dtype=_TRADE_DTYPE)
+        count = _simulate_kernel(
+            open_prices, buy_signals, sell_signals,
+            float(self.initial_balance), float(self.commission_rate), trades
+        )
+        
+        # Close any remaining position at end of period
+        closed_at_end = count % 2 == 1
+        if closed_at_end:
+            current_price = close_prices[-1]
+            shares = trades[count - 1]["shares"]
+            sell_value = shares * current_price
+            commission = sell_value * self.commission_rate
+            trades[count] = (len(df) - 1, current_price, shares, commission, sell_value - commission)
+            count += 1
+        
+        trades = trades[:count]
+        fills = trades["fill"]
+        prices = trades["price"]
+        shares = trades["shares"]
+        commissions = trades["commission"]
+        balances = trades["balance"]
+        
+        signal_prices = close_prices[fills - 1]
+        if closed_at_end:
+            signal_prices[-1] = close_prices[-1]
+        
+        if not len(fills):
+            return [], self.initial_balance
+        
+        # Trades alternate BUY, SELL; every sell closes the buy before it
+        sell_shares = shares[1::2]
+        buy_commissions = np.round(commissions[0::2], 2)
+        proceeds = sell_shares * prices[1::2]
+        
+        # Calculate profit/loss against the buy's recorded commission
+        cost_basis = sell_shares * prices[0::2][:len(sell_shares)] + buy_commissions[:len(sell_shares)]
+        profit_loss = balances[1::2] - cost_basis
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_loss_pct = np.where(cost_basis > 0, (profit_loss / cost_basis) * 100, 0.0)
+        
+        # Values stay numpy scalars, so statistics round them as before
+        signal_prices = list(np.round(signal_prices, 2))
+        execution_prices = list(np.round(prices, 2))
+        shares_out = list(np.round(shares, 4))
+        commissions_out = list(np.round(commissions, 2))
+        balances_out = list(np.round(balances, 2))
+        proceeds = list(np.round(proceeds, 2))
+        profit_loss = list(np.round(profit_loss, 2))
+        profit_loss_pct = list(np.round(profit_loss_pct, 2))
+        
+        dates = df.index[fills]
+        signal_dates = [self._format_date(date) for date in df.index[fills - 1]]
+        if closed_at_end:
+            signal_dates[-1] = "End of period"
+        
+        # Calculate hold days for all sells at once; floor division matches
+        # Timedelta.days, including intraday bars
+        if isinstance(dates, pd.DatetimeIndex):
+            times = dates.values
+            hold_days = ((times[1::2] - times[0::2]) // np.timedelta64(1, 'D')).tolist()
+        else:
+            hold_days = [
+                (sell_date - buy_date).days if hasattr(sell_date, '__sub__') else 0
+                for buy_date, sell_date in zip(dates[0::2], dates[1::2])
+            ]
+        
+        trades = []
+        for n in range(len(fills)):
+            current_date = dates[n]
             
-            # Execute pending buy at next day's open
-            if pending_buy and i > 0:
-                execution_price = df['Open'].iloc[i]
-                commission = balance * self.commission_rate
-                shares = (balance - commission) / execution_price
-                buy_price = execution_price
-                buy_date = current_date
-                position_open = True
-                pending_buy = False
-                
+            if n % 2 == 0:
                 trades.append({
                     "type": "BUY",
-                    "signal_date": self._format_date(signal_date),
+                    "signal_date": signal_dates[n],
                     "execution_date": self._format_date(current_date),
-                    "signal_price": round(df['Close'].iloc[i-1], 2),
-                    "execution_price": round(execution_price, 2),
-                    "shares": round(shares, 4),
-                    "commission": round(commission, 2),
-                    "balance_after": round(balance - commission, 2)
+                    "signal_price": signal_prices[n],
+                    "execution_price": execution_prices[n],
+                    "shares": shares_out[n],
+                    "commission": commissions_out[n],
+                    "balance_after": balances_out[n]
                 })
-            
-            # Execute pending sell at next day's open
-            elif pending_sell and i > 0:
-                execution_price = df['Open'].iloc[i]
-                sell_value = shares * execution_price
-                commission = sell_value * self.commission_rate
-                net_proceeds = sell_value - commission
-                
-                # Calculate profit/loss
-                cost_basis = shares * buy_price + trades[-1]["commission"]
-                profit_loss = net_proceeds - cost_basis
-                profit_loss_pct = (profit_loss / cost_basis) * 100 if cost_basis > 0 else 0
-                
-                # Calculate hold days
-                hold_days = (current_date - buy_date).days if hasattr(current_date, '__sub__') else 0
-                
-                balance = net_proceeds
-                
+            else:
                 trades.append({
                     "type": "SELL",
-                    "signal_date": self._format_date(signal_date),
+                    "signal_date": signal_dates[n],
                     "execution_date": self._format_date(current_date),
-                    "signal_price": round(df['Close'].iloc[i-1], 2),
-                    "execution_price": round(execution_price, 2),
-                    "shares": round(shares, 4),
-                    "commission": round(commission, 2),
-                    "proceeds": round(sell_value, 2),
-                    "net_proceeds": round(net_proceeds, 2),
-                    "profit_loss": round(profit_loss, 2),
-                    "profit_loss_percentage": round(profit_loss_pct, 2),
-                    "balance_after": round(balance, 2),
-                    "hold_days": hold_days
+                    "signal_price": signal_prices[n],
+                    "execution_price": execution_prices[n],
+                    "shares": shares_out[n],
+                    "commission": commissions_out[n],
+                    "proceeds": proceeds[n // 2],
+                    "net_proceeds": balances_out[n],
+                    "profit_loss": profit_loss[n // 2],
+                    "profit_loss_percentage": profit_loss_pct[n // 2],
+                    "balance_after": balances_out[n],
+                    "hold_days": hold_days[n // 2]
                 })
-                
-                shares = 0
-                position_open = False
-                pending_sell = False
-        
-        # Close any remaining position at end of period
-        if position_open:
-            current_price = df['Close'].iloc[-1]
-            current_date = df.index[-1]
-            sell_value = shares * current_price
-            commission = sell_value * self.commission_rate
-            net_proceeds = sell_value - commission
-            
-            cost_basis = shares * buy_price + trades[-1]["commission"]
-            profit_loss = net_proceeds - cost_basis
-            profit_loss_pct = (profit_loss / cost_basis) * 100 if cost_basis > 0 else 0
-            hold_days = (current_date - buy_date).days if hasattr(current_date, '__sub__') else 0
-            
-            balance = net_proceeds
-            
-            trades.append({
-                "type": "SELL",
-                "signal_date": "End of period",
-                "execution_date": self._format_date(current_date),
-                "signal_price": round(current_price, 2),
-                "execution_price": round(current_price, 2),
-                "shares": round(shares, 4),
-                "commission": round(commission, 2),
-                "proceeds": round(sell_value, 2),
-                "net_proceeds": round(net_proceeds, 2),
-                "profit_loss": round(profit_loss, 2),
-                "profit_loss_percentage": round(profit_loss_pct, 2),
-                "balance_after": round(balance, 2),
-                "hold_days": hold_days
-            })
         
-        return trades, balance
+        return trades, balances[-1]
     
     def _calculate_statistics(
         self,
@@ -0,0 +1,93 @@
+"""
+Market Scanner Tests
+
+Scans run on synthetic price histories, with the downloads patched out.
+"""
+
+import os
+import signal
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from app.services import market_scanner
+from app.services.market_scanner import MarketScanner, PROCESS_POOL_MIN_STOCKS, SCAN_CHUNK_SIZE
+
+
+def _history(phase: float) -> pd.DataFrame:
+    """Synthetic daily OHLC history that produces a few trades."""
+    prices = 100 + 10 * np.sin(np.arange(120) / 6.0 + phase)
+    return pd.DataFrame(
+        {"Open": prices, "High": prices + 1, "Low": prices - 1, "Close": prices},
+        index=pd.date_range("2020-01-01", periods=len(prices), freq="D")
+    )
+
+
+def _kill_pool_workers(pool):
+    """SIGKILL every worker of a process pool and wait until it notices."""
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+    deadline = time.monotonic() + 30
+    while not pool._broken and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+class ScanBrokenProcessPoolTest(unittest.TestCase):
+    """A worker dying mid-scan must not fail this scan or later ones."""
+    
+    def setUp(self):
+        self.stocks = [f"S{i}" for i in range(PROCESS_POOL_MIN_STOCKS + SCAN_CHUNK_SIZE)]
+        self.frames = {symbol: _history(i / 7.0) for i, symbol in enumerate(self.stocks)}
+        self.scanner = MarketScanner()
+        self.addCleanup(market_scanner.shutdown_process_pool)
+        
+        # Force the process pool path on single-core hosts too
+        patcher = mock.patch.object(market_scanner.os, "cpu_count", return_value=2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def _histories(self, kill_after_first_chunk: bool):
+        def iter_histories(symbols, period, interval, chunk_size, persist):
+            for start in range(0, len(symbols), chunk_size):
+                if start and kill_after_first_chunk:
+                    _kill_pool_workers(market_scanner._get_process_pool())
+                yield {symbol: self.frames[symbol] for symbol in symbols[start:start + chunk_size]}
+        return mock.patch.object(market_scanner, "iter_histories", iter_histories)
+    
+    def _scan(self, tracker=None):
+        return self.scanner._scan_stocks(
+            self.stocks, "macd", "macd", "6mo", "1d", None, None, 1, tracker
+        )
+    
+    def test_scan_completes_and_next_scan_gets_fresh_pool(self):
+        with self._histories(kill_after_first_chunk=False):
+            expected = self._scan()
+        self.assertEqual(expected[1], len(self.stocks))
+        
+        broken_pool = market_scanner._get_process_pool()
+        with self._histories(kill_after_first_chunk=True):
+            results, successful, failed, skipped = self._scan()
+        self.assertEqual((successful, failed, skipped), expected[1:])
+        self.assertEqual([r["stock"] for r in results], [r["stock"] for r in expected[0]])
+        
+        with self._histories(kill_after_first_chunk=False):
+            self.assertEqual(self._scan()[1:], expected[1:])
+        self.assertIsNot(market_scanner._get_process_pool(), broken_pool)
+    
+    def test_early_exit_rescans_stocks_lost_to_broken_pool(self):
+        tracker = market_scanner._TopTracker(
+            len(self.stocks), 1, [], market_scanner.SortKey("return_percentage")
+        )
+        with self._histories(kill_after_first_chunk=True):
+            _, successful, failed, skipped = self._scan(tracker)
+        self.assertEqual((successful, failed, skipped), (len(self.stocks), 0, 0))
+        # Every chunk but the last is offered to the tracker during the scan
+        last_chunk = len(self.stocks) % SCAN_CHUNK_SIZE or SCAN_CHUNK_SIZE
+        self.assertEqual(len(tracker._heap), len(self.stocks) - last_chunk)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Signal Detector Tests
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app.services.signal_detector import SignalDetector
+
+
+def _history() -> pd.DataFrame:
+    """Synthetic daily OHLC history with MACD and KDJ signals."""
+    prices = 100 + 10 * np.sin(np.arange(120) / 6.0) + np.arange(120) / 10.0
+    return pd.DataFrame(
+        {"Open": prices, "High": prices + 1, "Low": prices - 1, "Close": prices},
+        index=pd.date_range("2020-01-01", periods=len(prices), freq="D")
+    )
+
+
+class GenerateSignalsTest(unittest.TestCase):
+    """generate_signals must reflect a frame's current data."""
+    
+    def setUp(self):
+        self.detector = SignalDetector()
+    
+    def assert_signals_equal(self, actual, expected):
+        for actual_signals, expected_signals in zip(actual, expected):
+            np.testing.assert_array_equal(actual_signals, expected_signals)
+    
+    def test_frame_changed_in_place_is_recomputed(self):
+        df = _history()
+        before = self.detector.generate_signals(df, "MACD", "MACD")
+        
+        df["Close"] = df["Close"].to_numpy()[::-1]
+        after = self.detector.generate_signals(df, "MACD", "MACD")
+        
+        self.assert_signals_equal(after, self.detector.generate_signals(df.copy(), "MACD", "MACD"))
+        self.assertFalse(np.array_equal(before[0], after[0]) and np.array_equal(before[1], after[1]))
+    
+    def test_frame_grown_in_place_is_recomputed(self):
+        df = _history()
+        self.detector.generate_signals(df, "kdj", "kdj")
+        
+        df.loc[df.index[-1] + pd.Timedelta(days=1)] = df.iloc[-1]
+        buy_signals, sell_signals = self.detector.generate_signals(df, "kdj", "kdj")
+        
+        self.assertEqual(len(buy_signals), len(df))
+        self.assertEqual(len(sell_signals), len(df))
+    
+    def test_precomputed_indicators_match(self):
+        df = _history()
+        indicators = self.detector.get_indicator_arrays(df)
+        for buy, sell, threshold in [("macd", "macd", None), ("kdj", "macd", 30), ("macd", "kdj", 70)]:
+            self.assert_signals_equal(
+                self.detector.generate_signals(df, buy, sell, threshold, threshold, indicators=indicators),
+                self.detector.generate_signals(df, buy, sell, threshold, threshold)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()